@@ -0,0 +1,127 @@
+import os
+import time
+import random
+import tempfile
+from Backend.csp_model import assign_sessions, session_order, build_timetable
+from Backend.two_phase import solve_two_phase
+from Backend.scoring import evaluate
+from Backend.symmetry import session_classes, canonical_order, report_symmetry
+
+# anytime solving: a pass of the chosen solver mode is the first incumbent,
+# then we keep trying to improve it until the wall-clock budget runs out
+#   - repair: free up a few sessions (and the ones around failed sessions)
+#     and re-insert them greedily around the rest of the incumbent
+#   - restart: a fresh pass of the solver mode with the failed sessions tried first
+# every improvement is written to Output/ straight away, so killing the run
+# still leaves the best timetable found so far
+
+CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Output", "anytime_best.csv")
+
+RESTART_EVERY = 5       # every 5th improvement step is a full restart
+RUIN_FRACTION = 0.08    # share of the sessions freed up by one repair step
+
+
+def write_checkpoint(sessions, solution, instance, path):
+    # write to a temp file next to the target and swap it in, so readers never
+    # see a half-written CSV
+    timetable_df = build_timetable(sessions, solution, instance)
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".anytime_", suffix=".csv", dir=folder)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            timetable_df.to_csv(f, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def pick_ruined(sessions, solution, failed_ids, rng):
+    # sessions sharing a section with a failed one, plus a random handful
+    failed_sections = set()
+    for i in failed_ids:
+        failed_sections.update(sessions.section_codes(i))
+
+    ruined = set()
+    if failed_sections:
+        for i in solution:
+            if failed_sections.intersection(sessions.section_codes(i)):
+                ruined.add(i)
+
+    assigned = list(solution)
+    k = max(1, int(len(assigned) * RUIN_FRACTION))
+    ruined.update(rng.sample(assigned, min(k, len(assigned))))
+    return ruined
+
+
+def solve_anytime(sessions, instance, time_budget, seed=None, checkpoint_path=CHECKPOINT_FILE, verbose=True,
+                  mode="greedy", workers=None, max_iterations=None):
+    # returns the best (solution, failed, group_days_used) found plus a history
+    # of (seconds, scheduled, soft score, phase) for every improvement
+    # mode: "greedy" or "two_phase" for the start and the restarts
+    # max_iterations: also stop after this many steps - with a seed, the same
+    # result on any machine that gets through them within the time budget
+    start = time.monotonic()
+    deadline = start + time_budget
+    rng = random.Random(seed)
+
+    def construct(order=None):
+        if mode == "two_phase":
+            return solve_two_phase(sessions, instance, rng, workers=workers, verbose=False, order=order)
+        return assign_sessions(sessions, instance, rng, verbose=False, order=order)
+
+    # orders that only swap interchangeable sessions are the same search - but
+    # only from an empty start: once the rest is fixed, siblings aren't
+    # interchangeable any more, so repair orders stay as shuffled
+    session_class = session_classes(sessions, instance)
+    base_order = canonical_order(session_order(sessions), session_class)
+    best = construct()
+    best_score = evaluate(sessions, best[0], instance)
+    history = [(0.0, best_score[0], best_score[1], mode)]
+    if checkpoint_path:
+        write_checkpoint(sessions, best[0], instance, checkpoint_path)
+
+    if verbose:
+        report_symmetry(sessions, instance)
+        print(f"⏱️ Anytime mode: {time_budget:g}s budget, {mode} start "
+              f"{best_score[0]}/{len(sessions)} scheduled, soft score {best_score[1]}")
+
+    iterations = 0
+    while time.monotonic() < deadline and (max_iterations is None or iterations < max_iterations):
+        iterations += 1
+        solution = best[0]
+        failed_ids = [f["index"] for f in best[1]]
+
+        if iterations % RESTART_EVERY == 0:
+            phase = "restart"
+            failed_set = set(failed_ids)
+            order = failed_ids + [i for i in base_order if i not in failed_set]
+            order = canonical_order(order, session_class)
+            candidate = construct(order)
+        else:
+            phase = "repair"
+            ruined = pick_ruined(sessions, solution, failed_ids, rng)
+            fixed = {i: v for i, v in solution.items() if i not in ruined}
+            ruined = list(ruined)
+            rng.shuffle(ruined)
+            order = failed_ids + ruined
+            candidate = assign_sessions(sessions, instance, rng, verbose=False,
+                                        order=order, fixed=fixed)
+
+        score = evaluate(sessions, candidate[0], instance)
+        if score > best_score:
+            best, best_score = candidate, score
+            elapsed = time.monotonic() - start
+            history.append((round(elapsed, 3), score[0], score[1], phase))
+            if checkpoint_path:
+                write_checkpoint(sessions, best[0], instance, checkpoint_path)
+            if verbose:
+                print(f"   {elapsed:6.2f}s  {phase:<7}  {score[0]}/{len(sessions)} scheduled, soft score {score[1]}")
+
+    if verbose:
+        print(f"⏱️ Anytime mode finished after {iterations} improvement steps")
+
+    return best, history
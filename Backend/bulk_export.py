@@ -0,0 +1,270 @@
+import io
+import os
+import re
+import csv
+import sys
+import argparse
+import zipfile
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from Backend.preferences import parse_clock
+from Backend.timetable_store import query_run, COLUMNS
+
+# personal timetables for everyone in one zip:
+#   instructors/<name>.ics + .csv, rooms/<room>.ics + .csv, sections/<id>.ics + .csv
+# the timetable is grouped once (those entries stay in memory, like the
+# timetable itself), every entity is rendered on its own (in a process pool
+# for big exports) and each file goes into the archive as soon as it's
+# rendered. At most a window of workers * 4 renders is in flight, so rendered
+# files never pile up however many entities there are
+
+DEFAULT_ZIP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Output", "timetables_export.zip")
+
+ENTITIES = {
+    "instructor": ("Instructor", "instructors"),
+    "room": ("Room", "rooms"),
+    "section": ("SectionID", "sections"),
+}
+FORMATS = ("ics", "csv")
+
+WEEKDAYS = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3,
+            "Friday": 4, "Saturday": 5, "Sunday": 6}
+
+CSV_COLUMNS = ["Day", "StartTime", "EndTime", "CourseID", "SessionType",
+               "Sections", "Instructor", "Room", "TimeSlot"]
+
+
+def group_entries(timetable_df, by=tuple(ENTITIES)):
+    # one pass over the timetable -> {entity kind: {name: [entry dicts]}}
+    # lectures have one row per section, instructors and rooms get them merged
+    # into one entry listing all the sections
+    groups = {kind: {} for kind in by}
+    for row in timetable_df[COLUMNS].astype(str).itertuples(index=False):
+        for kind in by:
+            name = getattr(row, ENTITIES[kind][0])
+            entries = groups[kind].setdefault(name, {})
+            key = (row.CourseID, row.SessionType, row.TimeSlot)
+            entry = entries.get(key)
+            if entry is None:
+                entries[key] = {
+                    "Day": row.Day, "StartTime": row.StartTime, "EndTime": row.EndTime,
+                    "CourseID": row.CourseID, "SessionType": row.SessionType,
+                    "Sections": [row.SectionID], "Instructor": row.Instructor,
+                    "Room": row.Room, "TimeSlot": row.TimeSlot,
+                }
+            elif row.SectionID not in entry["Sections"]:
+                entry["Sections"].append(row.SectionID)
+    return {kind: {name: list(entries.values()) for name, entries in names.items()}
+            for kind, names in groups.items()}
+
+
+def file_name(name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name.strip()).strip("_") or "unnamed"
+
+
+def unique_file_names(names):
+    # name -> file name, with "_2", "_3", ... on names that would come out the
+    # same (compared ignoring case, for case-insensitive file systems)
+    taken = set()
+    out = {}
+    for name in names:
+        stem = file_name(name)
+        candidate, k = stem, 1
+        while candidate.lower() in taken:
+            k += 1
+            candidate = f"{stem}_{k}"
+        taken.add(candidate.lower())
+        out[name] = candidate
+    return out
+
+
+def entry_sort_key(entry):
+    try:
+        start = parse_clock(entry["StartTime"])
+    except ValueError:
+        start = datetime.min
+    return WEEKDAYS.get(entry["Day"], 7), start
+
+
+def ics_text(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def ics_fold(line):
+    # lines longer than 75 octets continue on the next line after a space
+    out = []
+    data = line.encode("utf-8")
+    while len(data) > (74 if out else 75):
+        cut = 74 if out else 75
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # don't split a utf-8 character
+        out.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+    out.append(data.decode("utf-8"))
+    return "\r\n ".join(out)
+
+
+def first_date(term_start, day):
+    # first date on or after term_start that falls on `day`
+    return term_start + timedelta(days=(WEEKDAYS[day] - term_start.weekday()) % 7)
+
+
+def render_ics(kind, name, entries, term_start, weeks, stamp):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//CSIT Timetable//Bulk export//EN",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{ics_text(name)}",
+    ]
+    for entry in entries:
+        if entry["Day"] not in WEEKDAYS:
+            continue
+        try:
+            start = parse_clock(entry["StartTime"])
+            end = parse_clock(entry["EndTime"])
+        except ValueError:
+            continue
+        day = first_date(term_start, entry["Day"])
+        sections = ", ".join(entry["Sections"])
+        uid = file_name(f"{kind}-{name}-{entry['CourseID']}-{entry['SessionType']}-{entry['TimeSlot']}")
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}@csit-timetable",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{day:%Y%m%d}T{start:%H%M}00",
+            f"DTEND:{day:%Y%m%d}T{end:%H%M}00",
+            f"RRULE:FREQ=WEEKLY;COUNT={weeks}",
+            f"SUMMARY:{ics_text(entry['CourseID'] + ' ' + entry['SessionType'])}",
+            f"LOCATION:{ics_text(entry['Room'])}",
+            f"DESCRIPTION:{ics_text('Instructor: ' + entry['Instructor'] + chr(10) + 'Sections: ' + sections)}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(ics_fold(line) for line in lines) + "\r\n"
+
+
+def render_csv(entries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for entry in entries:
+        writer.writerow([" ".join(entry[c]) if c == "Sections" else entry[c] for c in CSV_COLUMNS])
+    return buffer.getvalue()
+
+
+def merge_blocks(entries):
+    # a session spanning several slots comes in as one entry per slot, back to
+    # back in the sorted list - turn every run into one longer entry
+    merged = []
+    for entry in entries:
+        last = merged[-1] if merged else None
+        if last and all(last[c] == entry[c] for c in ("Day", "CourseID", "SessionType", "Instructor", "Room", "Sections")):
+            last["EndTime"] = entry["EndTime"]
+            last["TimeSlot"] = last["TimeSlot"].split("+")[0] + "+" + entry["TimeSlot"]
+        else:
+            merged.append(dict(entry))
+    return merged
+
+
+def render_entity(task):
+    # (kind, name, stem, entries, term_start, weeks, formats, stamp) -> [(path in zip, bytes)]
+    # top level so the process pool can pickle it
+    kind, name, stem, entries, term_start, weeks, formats, stamp = task
+    entries = merge_blocks(sorted(entries, key=entry_sort_key))
+    base = f"{ENTITIES[kind][1]}/{stem}"
+    files = []
+    if "ics" in formats:
+        files.append((f"{base}.ics", render_ics(kind, name, entries, term_start, weeks, stamp).encode("utf-8")))
+    if "csv" in formats:
+        files.append((f"{base}.csv", render_csv(entries).encode("utf-8")))
+    return files
+
+
+def export_zip(timetable_df, out, term_start=None, weeks=15, by=tuple(ENTITIES),
+               formats=FORMATS, workers=None):
+    # write the archive to `out` (a path or a writable file object, which
+    # doesn't need to be seekable) and return how many files went in
+    term_start = term_start or date.today()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    groups = group_entries(timetable_df, by)
+
+    tasks = []
+    for kind in by:
+        names = sorted(groups[kind])
+        stems = unique_file_names(names)
+        tasks += [(kind, name, stems[name], groups[kind][name], term_start, weeks, tuple(formats), stamp)
+                  for name in names]
+    workers = workers or os.cpu_count() or 1
+
+    count = 0
+    if isinstance(out, str):
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        if workers > 1 and len(tasks) > 1:
+            # pool.map would submit everything up front and hold every result
+            # until it's read, so keep a bounded window of futures instead,
+            # written oldest first to keep the archive order stable
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                window = deque()
+                for task in tasks:
+                    if len(window) >= workers * 4:
+                        count += write_files(archive, window.popleft().result())
+                    window.append(pool.submit(render_entity, task))
+                while window:
+                    count += write_files(archive, window.popleft().result())
+        else:
+            for task in tasks:
+                count += write_files(archive, render_entity(task))
+    return count
+
+
+def write_files(archive, files):
+    for path, content in files:
+        archive.writestr(path, content)
+    return len(files)
+
+
+def export_bytes(timetable_df, **kwargs):
+    # the whole archive in memory, for download buttons
+    buffer = io.BytesIO()
+    export_zip(timetable_df, buffer, **kwargs)
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export personal timetables (iCalendar + CSV) as a zip")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--run", type=int, default=None, help="stored run id (default latest)")
+    source.add_argument("--csv", default=None, help="read a timetable CSV instead of the store")
+    parser.add_argument("--db", default=None, help="database file (default Output/timetables.db)")
+    parser.add_argument("--out", default=DEFAULT_ZIP, help="zip file to write (- for stdout)")
+    parser.add_argument("--by", nargs="+", choices=list(ENTITIES), default=list(ENTITIES))
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS), dest="formats")
+    parser.add_argument("--term-start", type=date.fromisoformat, default=None,
+                        help="first day of term, YYYY-MM-DD (default today)")
+    parser.add_argument("--weeks", type=int, default=15, help="weeks in the term")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default all cores)")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        timetable_df = pd.read_csv(args.csv)
+    else:
+        timetable_df = query_run(args.run, db_path=args.db)
+    if timetable_df.empty:
+        print("❌ Nothing to export: the timetable is empty")
+        return 1
+
+    out = sys.stdout.buffer if args.out == "-" else args.out
+    count = export_zip(timetable_df, out, args.term_start, args.weeks, tuple(args.by),
+                       tuple(args.formats), args.workers)
+    if args.out != "-":
+        print(f"✅ Exported {count} files to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+import os
+import random
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from Backend.session_store import LECTURE, LAB
+from Backend.data_loader import load_department, build_sessions
+from Backend.csp_model import prepare_instance, block_rooms, build_timetable
+from Backend.solver import solve_sessions, SOLVER_MODES
+from Backend.validator import find_conflicts, find_cross_clashes
+from Backend.timetable_store import save_run
+
+# several departments over one shared room pool
+#
+# every department has its own Courses/Instructors/Sections, Rooms.csv and
+# TimeSlots.csv are shared. The coordinator leases every (room, timeslot) to
+# one department, in proportion to how many sessions of that room type each
+# one has, and every department then solves on its own (in parallel) with the
+# rooms it doesn't hold blocked. Departments that end up with failed sessions
+# get the cells the others leased but didn't use, and are solved again.
+# Leases never overlap, so the merged timetable has no room clashes.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEPARTMENTS_DIR = os.path.join(ROOT, "CSV", "departments")
+OUTPUT_FILE = os.path.join(ROOT, "Output", "departments_timetable.csv")
+
+KINDS = {"Lecture": LECTURE, "Lab": LAB}
+
+
+def deal(quotas, n, offset=0):
+    # spread n items over departments by quota, interleaved so nobody gets
+    # all of one end of the list: pick whoever is furthest behind their share
+    total = sum(quotas)
+    given = [0] * len(quotas)
+    order = []
+    for k in range(n):
+        d = max(range(len(quotas)),
+                key=lambda d: (quotas[d] * (k + 1) / total - given[d], -((d - offset) % len(quotas))))
+        given[d] += 1
+        order.append(d)
+    return order
+
+
+def initial_leases(departments, instance):
+    # (room, timeslot) -> department index, per room type in proportion to demand
+    demand = [Counter(sessions.kind[i] for i in sessions) for sessions, _ in departments]
+    room_capacity = instance["room_capacity"]
+    owner = {}
+    for kind, rooms in ((LECTURE, instance["lecture_rooms"]), (LAB, instance["lab_rooms"])):
+        quotas = [d[kind] for d in demand]
+        if not sum(quotas):
+            continue
+        rooms = sorted(rooms, key=lambda r: -room_capacity.get(r, 0))
+        for s, timeslot in enumerate(instance["timeslots"]):
+            # rotate who gets the biggest rooms from slot to slot
+            for room, d in zip(rooms, deal(quotas, len(rooms), offset=s)):
+                owner[(room, timeslot)] = d
+    return owner
+
+
+def lease_instance(instance, owner, d):
+    # the department's instance with every cell it doesn't hold blocked
+    position = instance["slots"].position
+    blocked = defaultdict(int)
+    for (room, timeslot), holder in owner.items():
+        if holder != d:
+            blocked[room] |= 1 << position[timeslot]
+    return block_rooms(instance, blocked)
+
+
+def solve_department(task):
+    # top level so the process pool can pickle it
+    sessions, instance, mode, seed = task
+    solution, failed, _ = solve_sessions(sessions, instance, mode, seed, verbose=False, workers=1)
+    return solution, failed
+
+
+def solve_all(tasks, workers):
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            return list(pool.map(solve_department, tasks))
+    return [solve_department(task) for task in tasks]
+
+
+def rebalance(owner, results, departments, instance):
+    # hand the cells departments leased but didn't use to the other ones with
+    # failed sessions, split by how many of that room type they failed
+    # (nobody loses anything their current timetable uses)
+    # returns the departments that got something
+    slots = instance["slots"]
+    used = set()
+    for (sessions, _), (solution, _) in zip(departments, results):
+        for i, (_, room, start) in solution.items():
+            used.update((room, timeslot) for timeslot in slots.block_slots(start, sessions.duration[i]))
+
+    failing = [d for d in range(len(departments)) if results[d][1]]
+    needs = {d: Counter(KINDS[f["type"]] for f in results[d][1]) for d in failing}
+
+    room_kind = {room: LECTURE for room in instance["lecture_rooms"]}
+    room_kind.update({room: LAB for room in instance["lab_rooms"]})
+
+    spare = defaultdict(list)
+    for (room, timeslot), holder in sorted(owner.items()):
+        if (room, timeslot) not in used:
+            spare[(room_kind[room], holder)].append((room, timeslot))
+
+    helped = set()
+    for (kind, holder), cells in spare.items():
+        takers = [d for d in failing if d != holder and needs[d][kind]]
+        if not takers:
+            continue
+        for cell, k in zip(cells, deal([needs[d][kind] for d in takers], len(cells))):
+            owner[cell] = takers[k]
+            helped.add(takers[k])
+    return sorted(helped)
+
+
+def coordinate(departments, mode="greedy", seed=None, rounds=3, workers=None, verbose=True):
+    # departments: list of (sessions, instance) over the same rooms and timeslots
+    # returns (results, owner) with results[d] = (solution, failed)
+    workers = workers or os.cpu_count() or 1
+    rng = random.Random(seed)
+    base = departments[0][1]
+    owner = initial_leases(departments, base)
+
+    def tasks_for(ds):
+        return [(departments[d][0], lease_instance(departments[d][1], owner, d), mode, rng.randrange(2**31))
+                for d in ds]
+
+    results = solve_all(tasks_for(range(len(departments))), workers)
+
+    for round_no in range(1, rounds + 1):
+        if not any(failed for _, failed in results):
+            break
+        helped = rebalance(owner, results, departments, base)
+        if not helped:
+            break
+        retried = solve_all(tasks_for(helped), workers)
+        for d, (solution, failed) in zip(helped, retried):
+            # more cells can't hurt, but a fresh greedy pass can still be unlucky
+            if len(solution) > len(results[d][0]):
+                results[d] = (solution, failed)
+        if verbose:
+            print(f"   Rebalance {round_no}: {len(helped)} departments got more rooms, "
+                  f"{sum(len(f) for _, f in results)} sessions still failed")
+
+    return results, owner
+
+
+def run_departments(dept_paths=None, shared_path=None, mode="greedy", seed=None, rounds=3,
+                    workers=None, max_per_day=None, max_per_week=None, save=True):
+    # load, coordinate, merge and check - returns the merged timetable
+    if not dept_paths:
+        dept_paths = sorted(
+            os.path.join(DEPARTMENTS_DIR, name) for name in os.listdir(DEPARTMENTS_DIR)
+            if os.path.isdir(os.path.join(DEPARTMENTS_DIR, name))
+        ) if os.path.isdir(DEPARTMENTS_DIR) else []
+    if not dept_paths:
+        raise FileNotFoundError(f"❌ No department folders given and none in {DEPARTMENTS_DIR}")
+
+    names = [os.path.basename(os.path.normpath(path)) for path in dept_paths]
+    departments = []
+    for name, path in zip(names, dept_paths):
+        print(f"\n Loading department {name}...")
+        data = load_department(path, shared_path)
+        sessions = build_sessions(data)
+        departments.append((sessions, prepare_instance(data, max_per_day, max_per_week)))
+
+    seen = Counter(sec for sessions, _ in departments for sec in sessions.section_names)
+    shared_sections = sorted(sec for sec, n in seen.items() if n > 1)
+    if shared_sections:
+        print(f"⚠️ Warning: section IDs used by more than one department: {', '.join(shared_sections[:5])}")
+
+    print(f"\n Solving {len(departments)} departments ({mode}) over a shared room pool...")
+    results, owner = coordinate(departments, mode, seed, rounds, workers)
+
+    frames = []
+    conflicts = []
+    for d, (name, (sessions, instance), (solution, failed)) in enumerate(zip(names, departments, results)):
+        lecture_rooms = set(instance["lecture_rooms"])
+        leased = Counter("Lecture" if room in lecture_rooms else "Lab"
+                         for (room, _), holder in owner.items() if holder == d)
+        print(f"   {name}: {len(solution)}/{len(sessions)} sessions, "
+              f"leased {leased['Lecture']} lecture and {leased['Lab']} lab room-slots")
+        for f in failed[:5]:
+            print(f"      - {f['session']} ({f['course']} - {f['type']}): {f['reason']}")
+
+        df = build_timetable(sessions, solution, instance)
+        if df.empty:
+            continue
+        conflicts += find_conflicts(df, lease_instance(instance, owner, d))
+        df.insert(0, "Department", name)
+        frames.append(df)
+
+    merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if not merged.empty:
+        conflicts += find_cross_clashes(merged)
+
+    if conflicts:
+        print(f"❌ Merged timetable has {len(conflicts)} conflicts:")
+        for c in conflicts[:10]:
+            print(f"   - [{c['type']}] {c['detail']}")
+    else:
+        print("✅ Merged timetable is conflict-free")
+
+    if save and conflicts:
+        print("⚠️ Not saving or storing a timetable with conflicts")
+    elif save and not merged.empty:
+        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+        merged.to_csv(OUTPUT_FILE, index=False)
+        run_id = save_run(merged, label=f"departments: {', '.join(names)}")
+        print(f"\n✅ Merged timetable saved to: {OUTPUT_FILE}")
+        print(f"🗄️ Stored as run {run_id}")
+
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedule several departments over the shared rooms")
+    parser.add_argument("departments", nargs="*",
+                        help="department folders with Courses/Instructors/Sections.csv (default CSV/departments/*)")
+    parser.add_argument("--shared", default=None, help="folder with Rooms.csv and TimeSlots.csv (default CSV/)")
+    parser.add_argument("--mode", choices=SOLVER_MODES, default="greedy")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--rounds", type=int, default=3, help="rebalancing rounds")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default all cores)")
+    parser.add_argument("--max-per-day", type=int, default=None, help="teaching cap per instructor per day")
+    parser.add_argument("--max-per-week", type=int, default=None, help="teaching cap per instructor per week")
+    args = parser.parse_args(argv)
+
+    merged = run_departments(args.departments, args.shared, args.mode, args.seed, args.rounds,
+                             args.workers, args.max_per_day, args.max_per_week)
+    return 0 if not merged.empty else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,251 +1,417 @@
 import pandas as pd
 import random
 from collections import defaultdict
+from Backend.session_store import LECTURE, LAB
+from Backend.preferences import SlotIndex, compile_preferences
+from Backend.symmetry import room_classes
+from Backend.instructor_queue import InstructorQueue
+from Backend.data_loader import course_durations
 
-def solve_csp(sessions, data):
-    # greedy solver - try to spread classes across all 5 days to avoid conflicts
-    
-    print("🚀 Starting greedy solver (using full week)...")
-    
+DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
+
+
+def read_cap(value, default):
+    if value is None or pd.isna(value) or str(value).strip() == "":
+        return default
+    return int(value)
+
+
+def prepare_instance(data, max_per_day=None, max_per_week=None):
+    # parse the input tables once into the lookups the solvers need
+    # max_per_day / max_per_week: default teaching caps, the optional MaxPerDay
+    # and MaxPerWeek columns of Instructors.csv override them per person
     instructors_df = data["instructors"]
     rooms_df = data["rooms"]
     times_df = data["timeslots"]
-    
+
     # parse instructor info
     instructor_courses = {}
     instructor_roles = {}
-    instructor_prefs = {}
-    
+    instructor_caps = {}
+
     for _, row in instructors_df.iterrows():
         name = row["Name"]
         role = str(row.get("Role", "Professor"))
-        
+
         # get their qualified courses
         qualified = [x.strip().upper() for x in str(row["QualifiedCourses"]).split(",") if x.strip()]
         instructor_courses[name] = qualified
         instructor_roles[name] = role
-        
-        # check if they don't want to teach on certain days
-        pref = str(row["PreferredSlots"]).lower()
-        if "not on" in pref:
-            day = pref.split("not on")[-1].strip()
-            instructor_prefs[name] = day
-        else:
-            instructor_prefs[name] = None
-    
+
+        # how much they can teach per day / per week (None = no limit)
+        caps = (read_cap(row.get("MaxPerDay"), max_per_day), read_cap(row.get("MaxPerWeek"), max_per_week))
+        if caps != (None, None):
+            instructor_caps[name] = caps
+
+    # compile their PreferredSlots into availability masks over the timeslots
+    slots = SlotIndex(times_df)
+    instructor_masks = compile_preferences(instructors_df, slots)
+    instructor_preferences = {
+        name: str(pref).strip() for name, pref in zip(instructors_df["Name"], instructors_df["PreferredSlots"])
+        if pd.notna(pref) and str(pref).strip()
+    }
+
     # map timeslots to days
+    all_timeslots = times_df["TimeSlotID"].tolist()
     timeslot_to_day = {}
     day_to_timeslots = defaultdict(list)
-    
-    for _, ts_row in times_df.iterrows():
-        ts_id = ts_row["TimeSlotID"]
-        day = ts_row["Day"]
+
+    for ts_id, day in zip(times_df["TimeSlotID"], times_df["Day"]):
         timeslot_to_day[ts_id] = day
         day_to_timeslots[day].append(ts_id)
-    
-    days = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
-    print(f"📅 Working with: {', '.join(days)}")
-    
+
     # get room lists
     lecture_rooms = rooms_df[rooms_df["Type"].str.contains("Lecture", case=False)]["RoomID"].tolist()
     lab_rooms = rooms_df[rooms_df["Type"].str.contains("Lab", case=False)]["RoomID"].tolist()
-    
-    print(f"🏫 Got {len(lecture_rooms)} lecture rooms and {len(lab_rooms)} lab rooms")
-    
-    # track what's scheduled where/when
-    instructor_schedule = defaultdict(set)
-    room_schedule = defaultdict(set)
-    section_schedule = defaultdict(set)
+    room_capacity = {}
+    if "Capacity" in rooms_df.columns:
+        room_capacity = {room: int(cap) for room, cap in zip(rooms_df["RoomID"], rooms_df["Capacity"]) if pd.notna(cap)}
+
+    # students per section, for room capacity checks
+    section_sizes = {}
+    sections_df = data.get("sections")
+    if sections_df is not None and "StudentCount" in sections_df.columns:
+        section_sizes = {sec: int(n) for sec, n in zip(sections_df["SectionID"], sections_df["StudentCount"]) if pd.notna(n)}
+
+    # who can teach what, keyed by (course, kind)
+    qualified_for = defaultdict(list)
+    for name, courses in instructor_courses.items():
+        role = instructor_roles.get(name, "Professor")
+        for course_id in courses:
+            if "Professor" in role and "Assistant" not in role:
+                # lectures need actual professors
+                qualified_for[(course_id, LECTURE)].append(name)
+            if "Assistant" in role:
+                # labs can be taught by assistants
+                qualified_for[(course_id, LAB)].append(name)
+
+    return {
+        "days": DAYS,
+        "timeslots": all_timeslots,
+        "timeslot_to_day": timeslot_to_day,
+        "day_to_timeslots": dict(day_to_timeslots),
+        "times_dict": times_df.set_index("TimeSlotID").to_dict('index'),
+        "instructor_courses": instructor_courses,
+        "instructor_roles": instructor_roles,
+        "instructor_caps": instructor_caps,
+        "slots": slots,
+        "instructor_masks": instructor_masks,
+        "instructor_preferences": instructor_preferences,
+        "qualified_for": dict(qualified_for),
+        "lecture_rooms": lecture_rooms,
+        "lab_rooms": lab_rooms,
+        "room_capacity": room_capacity,
+        "section_sizes": section_sizes,
+        "session_durations": course_durations(data["courses"]) if "courses" in data else {},
+    }
+
+
+def restrict_instance(instance, exclude_rooms=(), exclude_instructors=(), exclude_timeslots=()):
+    # what-if copy of an instance with some rooms, instructors or timeslots taken away
+    exclude_rooms = set(exclude_rooms)
+    exclude_instructors = set(exclude_instructors)
+    exclude_timeslots = set(exclude_timeslots)
+
+    restricted = dict(instance)
+    restricted["lecture_rooms"] = [r for r in instance["lecture_rooms"] if r not in exclude_rooms]
+    restricted["lab_rooms"] = [r for r in instance["lab_rooms"] if r not in exclude_rooms]
+    restricted["qualified_for"] = {
+        key: [name for name in names if name not in exclude_instructors]
+        for key, names in instance["qualified_for"].items()
+    }
+    restricted["timeslots"] = [ts for ts in instance["timeslots"] if ts not in exclude_timeslots]
+    # the solvers also mask these out, so a multi-slot block can't run into one
+    slots = instance["slots"]
+    restricted["slot_blocked"] = instance.get("slot_blocked", 0) | slots.mask_of(
+        ts for ts in exclude_timeslots if ts in slots.position)
+    restricted["day_to_timeslots"] = {
+        day: [ts for ts in slots if ts not in exclude_timeslots]
+        for day, slots in instance["day_to_timeslots"].items()
+    }
+    return restricted
+
+
+def block_rooms(instance, room_blocked):
+    # copy of an instance where some rooms can't be used in some timeslots
+    # (e.g. leased to another department), room_blocked: RoomID -> slot mask
+    blocked = dict(instance.get("room_blocked", {}))
+    for room, mask in room_blocked.items():
+        blocked[room] = blocked.get(room, 0) | mask
+    restricted = dict(instance)
+    restricted["room_blocked"] = {room: mask for room, mask in blocked.items() if mask}
+    return restricted
+
+
+def prioritized_timeslots(days_already_used, instance):
+    # timeslots on days the group hasn't used yet first, then the rest
+    days = instance["days"]
+    day_to_timeslots = instance["day_to_timeslots"]
+
+    days_not_used = [d for d in days if d not in days_already_used]
+
+    # if we've used all days already, just use any
+    if not days_not_used:
+        days_not_used = days
+
+    timeslots_prioritized = []
+    seen = set()
+    for day in days_not_used:
+        for ts in day_to_timeslots.get(day, ()):
+            if ts not in seen:
+                seen.add(ts)
+                timeslots_prioritized.append(ts)
+    for ts in instance["timeslots"]:
+        if ts not in seen:
+            seen.add(ts)
+            timeslots_prioritized.append(ts)
+    return timeslots_prioritized
+
+
+def session_order(sessions):
+    # do lectures first since they're harder, bigger groups before smaller ones
+    kind = sessions.kind
+    sec_ptr = sessions.sec_ptr
+    return sorted(range(len(sessions)), key=lambda i: (kind[i], sec_ptr[i] - sec_ptr[i + 1]))
+
+
+def assign_sessions(sessions, instance, rng=None, verbose=True, order=None, fixed=None, instructor_choice="load"):
+    # greedy solver - try to spread classes across all 5 days to avoid conflicts
+    # returns (solution, failed, group_days_used) where solution maps a
+    # session index to (instructor, room, timeslot)
+    # order: session indices to try (default lectures first), fixed: partial
+    # solution to keep as it is and build around
+    # instructor_choice: "load" tries the least loaded / least scarce instructor
+    # first (see instructor_queue.py), "random" just shuffles them
+    rng = rng or random
+    queue = InstructorQueue(sessions, instance, rng)
+
+    timeslot_to_day = instance["timeslot_to_day"]
+    instructor_masks = instance["instructor_masks"]
+    slots = instance["slots"]
+    position = slots.position
+    full_mask = slots.full
+    excluded = instance.get("slot_blocked", 0)   # timeslots taken out of the instance
+    qualified_for = instance["qualified_for"]
+    durations = sessions.duration
+
+    # identical rooms are grouped, so a timeslot only needs one check per class
+    room_class_lists = room_classes(instance)
+    class_size = {}
+    room_class = {}
+    for kind, classes in room_class_lists.items():
+        for c, members in enumerate(classes):
+            class_size[(kind, c)] = len(members)
+            for room in members:
+                room_class[room] = (kind, c)
+
+    # track what's scheduled where/when, as bit masks over the timeslots
+    instructor_schedule = defaultdict(int)
+    room_schedule = defaultdict(int)
+    class_used = defaultdict(int)      # (kind, class, slot bit) -> rooms taken
+    class_full = defaultdict(int)      # (kind, class) -> slots with no room left
+    section_schedule = [0] * len(sessions.section_names)
     group_days_used = defaultdict(set)  # which days each group is using
-    
+
     solution = {}
-    
-    # sort sessions - do lectures first since they're harder
-    sessions_sorted = sorted(sessions, key=lambda s: (0 if s['session_type'] == 'Lecture' else 1, -len(s['sections'])))
-    
-    total = len(sessions_sorted)
+
+    if order is None:
+        order = session_order(sessions)
+    kinds = sessions.kind
+    courses = sessions.course
+    groups = sessions.group
+    sec_ptr = sessions.sec_ptr
+    sec_idx = sessions.sec_idx
+
+    def take_room(room, mask):
+        key = room_class.get(room)
+        if key is None:
+            return
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            class_used[key + (bit,)] += 1
+            if class_used[key + (bit,)] >= class_size[key]:
+                class_full[key] |= bit
+
+    # rooms that are off limits in some slots count as taken there
+    for room, mask in instance.get("room_blocked", {}).items():
+        room_schedule[room] |= mask
+        take_room(room, mask)
+
+    # pre-book whatever we were told to keep
+    for i, (instructor, room, timeslot) in (fixed or {}).items():
+        block = slots.block(position[timeslot], durations[i])
+        solution[i] = (instructor, room, timeslot)
+        instructor_schedule[instructor] |= block
+        room_schedule[room] |= block
+        take_room(room, block)
+        queue.assigned(instructor, sessions.course_names[courses[i]], kinds[i], timeslot, durations[i])
+        for s in sec_idx[sec_ptr[i]:sec_ptr[i + 1]]:
+            section_schedule[s] |= block
+        group_days_used[groups[i]].add(timeslot_to_day[timeslot])
+    order = [i for i in order if i not in solution]
+
+    total = len(order)
     assigned = 0
     failed = []
-    
-    print(f"📊 Trying to assign {total} sessions...\n")
-    
-    for idx, session in enumerate(sessions_sorted):
-        if (idx + 1) % 20 == 0:
+
+    if verbose:
+        print(f"📊 Trying to assign {total} sessions...\n")
+
+    for idx, i in enumerate(order):
+        if verbose and (idx + 1) % 20 == 0:
             print(f"   Progress: {idx + 1}/{total} sessions...")
-        
-        var_name = session["variable_name"]
-        course_id = session["course_id"]
-        session_type = session["session_type"]
-        sections = session["sections"]
-        group_name = session.get("group", "Unknown")
-        
-        # get all possible timeslots
-        all_timeslots = times_df["TimeSlotID"].tolist()
-        
+
+        kind = kinds[i]
+        course_id = sessions.course_names[courses[i]]
+        sections = sec_idx[sec_ptr[i]:sec_ptr[i + 1]]
+        group_code = groups[i]
+        duration = durations[i]
+
         # figure out which rooms we can use
-        valid_rooms = lab_rooms if session_type == "Lab" else lecture_rooms
-        
+        valid_classes = room_class_lists[kind]
+
         # find instructors who can teach this
-        valid_instructors = []
-        for name, courses in instructor_courses.items():
-            if course_id in courses:
-                role = instructor_roles.get(name, "Professor")
-                
-                if session_type == "Lecture":
-                    # lectures need actual professors
-                    if "Professor" in role and "Assistant" not in role:
-                        valid_instructors.append(name)
-                else:  # labs
-                    # labs can be taught by assistants
-                    if "Assistant" in role:
-                        valid_instructors.append(name)
-        
-        if not valid_instructors:
+        if instructor_choice == "load":
+            valid_instructors = queue.ranked(course_id, kind)
+        else:
+            valid_instructors = list(qualified_for.get((course_id, kind), ()))
+            rng.shuffle(valid_instructors)
+
+        if not qualified_for.get((course_id, kind)):
             failed.append({
-                "session": var_name,
+                "index": i,
+                "session": sessions.variable_name(i),
                 "course": course_id,
-                "type": session_type,
+                "type": sessions.session_type(i),
                 "reason": f"No qualified instructor"
             })
             continue
-        
+
         # try to pick days this group hasn't used yet
-        days_already_used = group_days_used[group_name]
-        days_not_used = [d for d in days if d not in days_already_used]
-        
-        # if we've used all days already, just use any
-        if not days_not_used:
-            days_not_used = days.copy()
-        
-        # build timeslot list with priorities
-        timeslots_prioritized = []
-        
-        # prefer unused days first
-        for day in days_not_used:
-            for ts in day_to_timeslots[day]:
-                if ts not in timeslots_prioritized:
-                    timeslots_prioritized.append(ts)
-        
-        # then add already-used days
-        for ts in all_timeslots:
-            if ts not in timeslots_prioritized:
-                timeslots_prioritized.append(ts)
-        
-        # shuffle to add some randomness
-        random.shuffle(valid_instructors)
-        random.shuffle(valid_rooms)
-        
+        timeslots_prioritized = prioritized_timeslots(group_days_used[group_code], instance)
+
+        # shuffle to add some randomness - rooms inside a class are
+        # interchangeable, so only the class order matters
+        class_order = list(range(len(valid_classes)))
+        rng.shuffle(class_order)
+
+        # sections can't have two classes at once
+        sections_busy = 0
+        for s in sections:
+            sections_busy |= section_schedule[s]
+
         # try to find a valid assignment
         found = False
-        
+
         for instructor in valid_instructors:
-            if found:
-                break
-            
+            # slots this instructor can take: their preferences (not a hard rule,
+            # but we respect them), minus where they or the sections are busy
+            # (and the days / week they've hit their teaching cap on)
+            busy = instructor_schedule[instructor] | sections_busy | queue.blocked(instructor, duration) | excluded
+            free = instructor_masks.get(instructor, full_mask) & ~busy
+            # where a whole block fits (same as free for single-slot sessions)
+            starts = slots.block_starts(free, duration)
+            if not starts:
+                continue
+
             for timeslot in timeslots_prioritized:
-                if found:
-                    break
-                
-                # check instructor preferences (not a hard rule)
-                blocked_day = instructor_prefs.get(instructor)
-                if blocked_day:
-                    actual_day = timeslot_to_day.get(timeslot, "").lower()
-                    if blocked_day in actual_day:
-                        continue
-                
-                # instructor can't teach two things at once
-                if timeslot in instructor_schedule[instructor]:
+                bit = 1 << position[timeslot]
+                if not starts & bit:
                     continue
-                
-                # sections can't have two classes at once
-                has_conflict = False
-                for sec_id in sections:
-                    if timeslot in section_schedule[sec_id]:
-                        has_conflict = True
-                        break
-                
-                if has_conflict:
-                    continue
-                
-                # try to find an available room
-                for room in valid_rooms:
-                    if timeslot in room_schedule[room]:
+                block = slots.block(position[timeslot], duration) if duration > 1 else bit
+
+                # try to find an available room - one look per class of identical rooms
+                for c in class_order:
+                    if class_full[(kind, c)] & block:
+                        continue
+                    room = next((r for r in valid_classes[c] if not room_schedule[r] & block), None)
+                    if room is None:
                         continue
-                    
+
                     # found a valid combo!
-                    solution[var_name] = (instructor, room, timeslot)
-                    
+                    solution[i] = (instructor, room, timeslot)
+
                     # update schedules
-                    instructor_schedule[instructor].add(timeslot)
-                    room_schedule[room].add(timeslot)
-                    for sec_id in sections:
-                        section_schedule[sec_id].add(timeslot)
-                    
+                    instructor_schedule[instructor] |= block
+                    room_schedule[room] |= block
+                    take_room(room, block)
+                    queue.assigned(instructor, course_id, kind, timeslot, duration)
+                    for s in sections:
+                        section_schedule[s] |= block
+
                     # track day usage
-                    assigned_day = timeslot_to_day[timeslot]
-                    group_days_used[group_name].add(assigned_day)
-                    
+                    group_days_used[group_code].add(timeslot_to_day[timeslot])
+
                     found = True
                     assigned += 1
                     break
-        
+
+                if found:
+                    break
+
+            if found:
+                break
+
         if not found:
+            queue.placed(course_id, kind)
             failed.append({
-                "session": var_name,
+                "index": i,
+                "session": sessions.variable_name(i),
                 "course": course_id,
-                "type": session_type,
+                "type": sessions.session_type(i),
                 "reason": "No valid combination found"
             })
-    
+
+    days_by_group = {sessions.group_names[g]: used for g, used in group_days_used.items()}
+    return solution, failed, days_by_group
+
+
+def build_timetable(sessions, solution, instance):
+    # convert a solution into the timetable dataframe (one row per section,
+    # and per timeslot for sessions that take several)
+    timetable_rows = []
+    times_dict = instance["times_dict"]
+    slots = instance["slots"]
+
+    for i in session_order(sessions):
+        if i not in solution:
+            continue
+
+        instructor, room, start = solution[i]
+        course_id = sessions.course_id(i)
+        session_type = sessions.session_type(i)
+
+        for timeslot in slots.block_slots(start, sessions.duration[i]):
+            time_info = times_dict[timeslot]
+            for sec_id in sessions.sections(i):
+                timetable_rows.append({
+                    "SectionID": sec_id,
+                    "CourseID": course_id,
+                    "SessionType": session_type,
+                    "Instructor": instructor,
+                    "Room": room,
+                    "TimeSlot": timeslot,
+                    "Day": time_info["Day"],
+                    "StartTime": time_info["StartTime"],
+                    "EndTime": time_info["EndTime"]
+                })
+
+    return pd.DataFrame(timetable_rows)
+
+
+def report_result(total, assigned, failed, group_days_used):
     print(f"\n✅ Successfully assigned: {assigned}/{total} sessions")
-    
+
     if failed:
         print(f"\n⚠️  Failed to assign {len(failed)} sessions:")
         for f in failed[:15]:  # show first 15
             print(f"   - {f['session']} ({f['course']} - {f['type']}): {f['reason']}")
         if len(failed) > 15:
             print(f"   ... and {len(failed) - 15} more")
-    
+
     # show day distribution
     print(f"\n📊 Day Distribution per Group:")
     for group_name in sorted(group_days_used.keys()):
         days_used = sorted(group_days_used[group_name])
         print(f"   {group_name}: {len(days_used)}/5 days → {', '.join(days_used)}")
-    
-    if assigned == 0:
-        print("❌ Couldn't assign anything!")
-        return pd.DataFrame()
-    
-    # convert to dataframe
-    timetable_rows = []
-    times_dict = times_df.set_index("TimeSlotID").to_dict('index')
-    
-    for session in sessions_sorted:
-        var_name = session["variable_name"]
-        if var_name not in solution:
-            continue
-        
-        instructor, room, timeslot = solution[var_name]
-        time_info = times_dict[timeslot]
-        
-        for sec_id in session["sections"]:
-            timetable_rows.append({
-                "SectionID": sec_id,
-                "CourseID": session["course_id"],
-                "SessionType": session["session_type"],
-                "Instructor": instructor,
-                "Room": room,
-                "TimeSlot": timeslot,
-                "Day": time_info["Day"],
-                "StartTime": time_info["StartTime"],
-                "EndTime": time_info["EndTime"]
-            })
-    
-    df = pd.DataFrame(timetable_rows)
-    
-    if df.empty:
-        print("❌ No timetable generated!")
-    else:
-        print(f"\n✅ Generated timetable with {len(df)} entries")
-    
-    return df
\ No newline at end of file
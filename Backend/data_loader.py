@@ -1,65 +1,298 @@
 import os
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+from Backend.session_store import SessionStore, LECTURE, LAB
+from Backend.preferences import parse_clock, SlotIndex, read_preference
 
-def load_data():
-    # load all the CSV files we need
-    base_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "CSV")
+FILES = {
+    "courses": "Courses.csv",
+    "instructors": "Instructors.csv",
+    "rooms": "Rooms.csv",
+    "timeslots": "TimeSlots.csv",
+    "sections": "Sections.csv"
+}
+
+# column -> dtype for every file: "string", "category" or a nullable int
+# optional columns are kept when they're there and skipped otherwise
+SCHEMAS = {
+    "courses": {
+        "required": {"CourseID": "string", "CourseName": "string", "Credits": "Int64", "Type": "category"},
+        "optional": {"LectureSlots": "Int64", "LabSlots": "Int64"},
+    },
+    "instructors": {
+        "required": {"InstructorID": "string", "Name": "string", "Role": "category",
+                     "PreferredSlots": "string", "QualifiedCourses": "string"},
+        "optional": {"MaxPerDay": "Int64", "MaxPerWeek": "Int64"},
+    },
+    "rooms": {
+        "required": {"RoomID": "string", "Type": "category", "Capacity": "Int64"},
+        "optional": {},
+    },
+    "timeslots": {
+        "required": {"Day": "category", "StartTime": "string", "EndTime": "string", "TimeSlotID": "string"},
+        "optional": {},
+    },
+    "sections": {
+        "required": {"SectionID": "string", "StudentCount": "Int64", "Courses": "string"},
+        "optional": {"Group": "string"},
+    },
+}
+
+KNOWN_DAYS = {"Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"}
+
+
+class DataValidationError(ValueError):
+    # the input tables are broken - problems holds one message per issue
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__(f"{len(problems)} problems in the input data: " + "; ".join(problems[:10]))
+
+
+def clean_column(name):
+    # BOMs (Sections.csv has one) and stray spaces in the header
+    return str(name).replace("\ufeff", "").strip()
+
+
+def read_table(source, key, engine=None):
+    # read one CSV (path or file-like) with the schema's columns and types
+    # everything comes in as text first, so nothing is guessed, then gets cast
+    schema = SCHEMAS[key]
+    wanted = {**schema["required"], **schema["optional"]}
+
+    if engine == "pyarrow":
+        df = pd.read_csv(source, dtype="string", engine="pyarrow", encoding="utf-8-sig")
+    else:
+        df = pd.read_csv(
+            source, dtype="string", encoding="utf-8-sig", skipinitialspace=True,
+            usecols=lambda col: clean_column(col) in wanted
+        )
+    df.columns = [clean_column(c) for c in df.columns]
+
+    missing = [c for c in schema["required"] if c not in df.columns]
+    if missing:
+        raise DataValidationError([f"{FILES[key]} is missing column(s): {', '.join(missing)}"])
+    df = df[[c for c in wanted if c in df.columns]]
+
+    problems = []
+    for col in df.columns:
+        values = df[col].str.strip().replace("", pd.NA)
+        dtype = wanted[col]
+        if dtype == "Int64":
+            numbers = pd.to_numeric(values, errors="coerce")
+            bad = values.notna() & (numbers.isna() | (numbers % 1 != 0))
+            if bad.any():
+                problems.append(f"{FILES[key]}: {col} must be a whole number, got {values[bad].iloc[0]!r}")
+                continue
+            df[col] = numbers.astype("Int64")
+        else:
+            df[col] = values.astype(dtype)
+
+    if problems:
+        raise DataValidationError(problems)
+    return df
+
+
+def default_engine(engine):
+    # "auto" picks pyarrow when it's installed
+    if engine == "auto":
+        return "pyarrow" if importlib.util.find_spec("pyarrow") else None
+    if engine == "pyarrow" and importlib.util.find_spec("pyarrow") is None:
+        print("⚠️ Warning: pyarrow is not installed, using the default CSV reader")
+        return None
+    return engine
+
+
+def load_sources(sources, engine=None, verbose=True):
+    # sources: key -> path or file-like object, read all at once in threads
+    engine = default_engine(engine)
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        futures = {key: pool.submit(read_table, src, key, engine) for key, src in sources.items()}
+        data = {key: future.result() for key, future in futures.items()}
+
+    if verbose:
+        for key in sources:
+            print(f"✅ Loaded {FILES[key]}: {len(data[key])} rows")
+    return data
+
+
+def validate_data(data):
+    # cross-table checks before any solving - returns (problems, warnings)
+    problems = []
+    warnings = []
+
+    def duplicates(key, col):
+        dup = data[key][col][data[key][col].duplicated()].dropna().unique().tolist()
+        if dup:
+            problems.append(f"{FILES[key]}: duplicate {col} {', '.join(map(str, dup[:5]))}")
+
+    duplicates("courses", "CourseID")
+    duplicates("instructors", "InstructorID")
+    duplicates("instructors", "Name")
+    duplicates("rooms", "RoomID")
+    duplicates("timeslots", "TimeSlotID")
+    duplicates("sections", "SectionID")
+
+    course_ids = set(data["courses"]["CourseID"].dropna().str.upper())
+
+    for sec_id, courses in zip(data["sections"]["SectionID"], data["sections"]["Courses"]):
+        listed = [c.strip().upper() for c in str(courses).split(",") if c.strip()] if pd.notna(courses) else []
+        unknown = [c for c in listed if c not in course_ids]
+        if unknown:
+            problems.append(f"{FILES['sections']}: {sec_id} takes unknown course(s) {', '.join(unknown)}")
+
+    # instructors often list courses that aren't offered this term - just warn
+    offered = set()
+    for name, courses in zip(data["instructors"]["Name"], data["instructors"]["QualifiedCourses"]):
+        if pd.notna(courses):
+            offered.update(c.strip().upper() for c in str(courses).split(",") if c.strip())
+    not_offered = sorted(offered - course_ids)
+    if not_offered:
+        warnings.append(f"{FILES['instructors']}: {len(not_offered)} qualified courses aren't in "
+                        f"{FILES['courses']} ({', '.join(not_offered[:5])}{', ...' if len(not_offered) > 5 else ''})")
+
+    timeslot_problems = len(problems)
+    for row in data["timeslots"].itertuples(index=False):
+        try:
+            start, end = parse_clock(str(row.StartTime)), parse_clock(str(row.EndTime))
+        except ValueError:
+            problems.append(f"{FILES['timeslots']}: {row.TimeSlotID} has a malformed time "
+                            f"({row.StartTime!r} - {row.EndTime!r})")
+            continue
+        if end <= start:
+            problems.append(f"{FILES['timeslots']}: {row.TimeSlotID} ends before it starts")
+        if str(row.Day) not in KNOWN_DAYS:
+            problems.append(f"{FILES['timeslots']}: {row.TimeSlotID} has unknown day {row.Day!r}")
+
+    # a PreferredSlots we can't read would leave the instructor free all week
+    if len(problems) == timeslot_problems:
+        slots = SlotIndex(data["timeslots"])
+        for name, pref in zip(data["instructors"]["Name"], data["instructors"]["PreferredSlots"]):
+            _, unreadable = read_preference(pref, slots)
+            if unreadable:
+                problems.append(f"{FILES['instructors']}: can't read the PreferredSlots of {name} "
+                                f"({', '.join(map(repr, unreadable))})")
+
+    room_types = data["rooms"]["Type"].astype("string").str.lower()
+    bad_rooms = data["rooms"]["RoomID"][~(room_types.str.contains("lecture") | room_types.str.contains("lab")).fillna(False)]
+    if len(bad_rooms):
+        problems.append(f"{FILES['rooms']}: rooms with a type that is neither Lecture nor Lab: {', '.join(bad_rooms[:5])}")
+    if (data["rooms"]["Capacity"].fillna(1) <= 0).any():
+        problems.append(f"{FILES['rooms']}: room capacities must be positive")
+
+    # multi-slot sessions have to fit in a day
+    slots_per_day = data["timeslots"]["Day"].value_counts()
+    longest_day = int(slots_per_day.max()) if len(slots_per_day) else 0
+    for col in ("LectureSlots", "LabSlots"):
+        if col not in data["courses"].columns:
+            continue
+        durations = data["courses"][col]
+        for course_id in data["courses"]["CourseID"][(durations < 1).fillna(False)]:
+            problems.append(f"{FILES['courses']}: {course_id} has {col} below 1")
+        for course_id in data["courses"]["CourseID"][(durations > longest_day).fillna(False)]:
+            problems.append(f"{FILES['courses']}: {course_id} needs more {col} than any day has ({longest_day})")
+
+    return problems, warnings
+
+
+def load_data(engine=None, base_path=None, verbose=True):
+    # load all the CSV files we need, typed and checked
+    # engine: None (pandas C reader), "pyarrow" or "auto"
+    base_path = base_path or os.path.join(os.path.dirname(os.path.dirname(__file__)), "CSV")
     
-    files = {
-        "courses": "Courses.csv",
-        "instructors": "Instructors.csv", 
-        "rooms": "Rooms.csv",
-        "timeslots": "TimeSlots.csv",
-        "sections": "Sections.csv"
-    }
+    sources = {}
+    for key, filename in FILES.items():
+        filepath = os.path.join(base_path, filename)
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"❌ Can't find: {filepath}")
+        sources[key] = filepath
     
-    data = {}
+    data = load_sources(sources, engine, verbose)
+    check_data(data, verbose)
+    return data
+
+
+# files every department has for itself, the rest (rooms, timeslots) is shared
+DEPARTMENT_FILES = ("courses", "instructors", "sections")
+
+
+def load_department(dept_path, shared_path=None, engine=None, verbose=True):
+    # one department's Courses/Instructors/Sections over the shared Rooms/TimeSlots
+    shared_path = shared_path or os.path.join(os.path.dirname(os.path.dirname(__file__)), "CSV")
     
-    for key, filename in files.items():
-        filepath = os.path.join(base_path, filename)
+    sources = {}
+    for key, filename in FILES.items():
+        folder = dept_path if key in DEPARTMENT_FILES else shared_path
+        filepath = os.path.join(folder, filename)
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"❌ Can't find: {filepath}")
-        
-        data[key] = pd.read_csv(filepath)
-        print(f"✅ Loaded {filename}: {len(data[key])} rows")
+        sources[key] = filepath
     
+    data = load_sources(sources, engine, verbose)
+    check_data(data, verbose)
     return data
 
 
+def check_data(data, verbose=True):
+    # raise DataValidationError if the tables don't fit together
+    problems, warnings = validate_data(data)
+    if verbose:
+        for warning in warnings:
+            print(f"⚠️ Warning: {warning}")
+    if problems:
+        raise DataValidationError(problems)
+
+
 def define_groups(sections_df):
     # group sections together - they share lectures but have separate labs
+    # an optional Group column says it directly, otherwise it comes from the IDs:
+    #   S<n>_<level>          -> <level>_G<k>, sections in blocks of 3 (S1-S3 -> G1)
+    #   S<n>_<track>_<level>  -> <level>_<track>
+    # anything else gets a group of its own
     groups = {}
     
-    # level 1 has 12 sections, split into 4 groups of 3
-    for i in range(4):
-        group_name = f"L1_G{i+1}"
-        sections = [f"S{j+1}_L1" for j in range(i*3, (i+1)*3)]
-        groups[group_name] = sections
-    
-    # level 2 has 9 sections, 3 groups of 3
-    for i in range(3):
-        group_name = f"L2_G{i+1}"
-        sections = [f"S{j+1}_L2" for j in range(i*3, (i+1)*3)]
-        groups[group_name] = sections
-    
-    # level 3 is track-based
-    groups["L3_AID"] = ["S1_AID_L3", "S2_AID_L3", "S3_AID_L3", "S4_AID_L3"]
-    groups["L3_CNC"] = ["S1_CNC_L3", "S2_CNC_L3", "S3_CNC_L3", "S4_CNC_L3"]
-    groups["L3_CSC"] = ["S1_CSC_L3"]
-    groups["L3_BIF"] = ["S1_BIF_L3"]
+    if "Group" in sections_df.columns:
+        for section_id, group in zip(sections_df["SectionID"], sections_df["Group"]):
+            if pd.notna(group) and str(group).strip():
+                groups.setdefault(str(group).strip(), []).append(section_id)
+        named = {sec for secs in groups.values() for sec in secs}
+    else:
+        named = set()
     
-    # level 4 tracks
-    groups["L4_AID"] = ["S1_AID_L4", "S2_AID_L4", "S3_AID_L4", "S4_AID_L4"]
-    groups["L4_CNC"] = ["S1_CNC_L4", "S2_CNC_L4", "S3_CNC_L4", "S4_CNC_L4"]
-    groups["L4_CSC"] = ["S1_CSC_L4"]
-    groups["L4_BIF"] = ["S1_BIF_L4"]
+    for section_id in sections_df["SectionID"]:
+        if section_id in named:
+            continue
+        parts = str(section_id).split("_")
+        number = parts[0][1:]
+        if parts[0][:1] == "S" and number.isdigit() and len(parts) == 2:
+            # general levels are split into groups of 3 sections
+            group_name = f"{parts[1]}_G{(int(number) - 1) // 3 + 1}"
+        elif parts[0][:1] == "S" and number.isdigit() and len(parts) == 3:
+            # later levels are track-based
+            group_name = f"{parts[2]}_{parts[1]}"
+        else:
+            group_name = str(section_id)
+        groups.setdefault(group_name, []).append(section_id)
     
     return groups
 
 
+def course_durations(courses_df):
+    # (course, kind) -> consecutive timeslots per session, from the optional
+    # LectureSlots / LabSlots columns (a 3-hour lab is LabSlots = 2)
+    durations = {}
+    for col, kind in (("LectureSlots", LECTURE), ("LabSlots", LAB)):
+        if col not in courses_df.columns:
+            continue
+        for course_id, n in zip(courses_df["CourseID"], courses_df[col]):
+            if pd.notna(n) and int(n) > 1:
+                durations[(str(course_id).upper(), kind)] = int(n)
+    return durations
+
+
 def build_sessions(data):
     # create all the sessions we need to schedule
-    sessions = []
+    sessions = SessionStore()
     
     courses_df = data["courses"]
     sections_df = data["sections"]
@@ -71,12 +304,17 @@ def build_sessions(data):
         for sec_id in section_list:
             section_to_group[sec_id] = group_name
     
+    # course id -> type, so we don't filter the dataframe for every course
+    course_types = {}
+    for course_id, course_type in zip(courses_df["CourseID"], courses_df["Type"]):
+        course_types.setdefault(str(course_id).upper(), str(course_type))
+    durations = course_durations(courses_df)
+    
     # keep track of lectures we already added per group
     lectures_done = set()
     
-    for _, section_row in sections_df.iterrows():
-        section_id = section_row["SectionID"]
-        course_ids = [c.strip().upper() for c in str(section_row["Courses"]).split(",")]
+    for section_id, courses in zip(sections_df["SectionID"], sections_df["Courses"]):
+        course_ids = [c.strip().upper() for c in str(courses).split(",")]
         group_name = section_to_group.get(section_id)
         
         if not group_name:
@@ -85,14 +323,12 @@ def build_sessions(data):
         
         for course_id in course_ids:
             # find course details
-            course_info = courses_df[courses_df["CourseID"].str.upper() == course_id]
+            course_type = course_types.get(course_id)
             
-            if course_info.empty:
+            if course_type is None:
                 print(f"⚠️ Warning: Course {course_id} not found")
                 continue
             
-            course_type = str(course_info.iloc[0]["Type"])
-            
             # check what type of sessions this course needs
             has_lecture = "lecture" in course_type.lower()
             has_lab = "lab" in course_type.lower()
@@ -101,24 +337,13 @@ def build_sessions(data):
             if has_lecture:
                 lec_key = (group_name, course_id, "Lecture")
                 if lec_key not in lectures_done:
-                    sessions.append({
-                        "group": group_name,
-                        "sections": groups[group_name],
-                        "course_id": course_id,
-                        "session_type": "Lecture",
-                        "variable_name": f"{group_name}_{course_id}_LEC"
-                    })
+                    sessions.add(group_name, course_id, LECTURE, groups[group_name],
+                                 durations.get((course_id, LECTURE), 1))
                     lectures_done.add(lec_key)
             
             # add lab (one per section)
             if has_lab:
-                sessions.append({
-                    "group": group_name,
-                    "sections": [section_id],
-                    "course_id": course_id,
-                    "session_type": "Lab",
-                    "variable_name": f"{section_id}_{course_id}_LAB"
-                })
+                sessions.add(group_name, course_id, LAB, [section_id], durations.get((course_id, LAB), 1))
     
     print(f"✅ Built {len(sessions)} sessions")
     return sessions
\ No newline at end of file
@@ -0,0 +1,287 @@
+import time
+from collections import Counter, defaultdict
+from Backend.session_store import LECTURE, LAB, SESSION_TYPES
+
+# why couldn't a failed session be placed, and what's the cheapest thing to change
+#
+# everything that stands in its way becomes an item:
+#   session     - a placed session holding one of its sections or one of its
+#                 qualified instructors in some slot
+#   rooms       - every room of its type is taken (or leased away) in a slot
+#   preference  - a qualified instructor's PreferredSlots
+#   cap         - a qualified instructor without enough left under their daily /
+#                 weekly cap for the session's length
+# placeable() is a bitmask check of "is there an instructor, slot and room left
+# with only these items in force". Deletion-based minimization drops every item
+# the session is still stuck without, which leaves a small core; relaxations
+# are picked from cores, cheapest first, until the session fits.
+
+COSTS = {"preference": 1, "cap": 2, "session": 3, "rooms": 5}
+
+# minimizing a core costs failures x placed sessions, so explaining gets about
+# as long as the solve took (and at least this long) - the rest is listed as
+# not explained rather than making a quick solve wait for seconds
+MIN_EXPLAIN_SECONDS = 0.25
+
+
+def explain_budget(solve_seconds):
+    return max(MIN_EXPLAIN_SECONDS, solve_seconds)
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def slot_label(instance, ts):
+    info = instance["times_dict"].get(ts, {})
+    return f"{info.get('Day', '?')} {info.get('StartTime', '?')}-{info.get('EndTime', '?')} ({ts})"
+
+
+def cap_blocks(sessions, solution, instance, duration=1):
+    # name -> (slots blocked by their caps, which caps) given the placed sessions,
+    # for a session of `duration` slots - the same rule as InstructorQueue.blocked
+    caps = instance.get("instructor_caps", {})
+    slots = instance["slots"]
+    timeslot_to_day = instance["timeslot_to_day"]
+
+    week_load = Counter()
+    day_load = Counter()
+    for i, (instructor, _, ts) in solution.items():
+        week_load[instructor] += sessions.duration[i]
+        day_load[(instructor, timeslot_to_day[ts])] += sessions.duration[i]
+
+    blocks = {}
+    for name, (day_cap, week_cap) in caps.items():
+        mask = 0
+        reasons = []
+        if week_cap is not None and week_load[name] + duration > week_cap:
+            mask = slots.full
+            reasons.append(f"weekly cap of {week_cap}")
+        elif day_cap is not None:
+            full_days = [day for day in slots.day_masks if day_load[(name, day)] + duration > day_cap]
+            for day in full_days:
+                mask |= slots.day_masks[day]
+            if full_days:
+                reasons.append(f"daily cap of {day_cap} on {', '.join(full_days)}")
+        if mask:
+            blocks[name] = (mask, reasons)
+    return blocks
+
+
+def conflict_items(i, sessions, instance, solution, blocks):
+    # every item that keeps session i out, plus the instructors it could have
+    kind = sessions.kind[i]
+    course_id = sessions.course_id(i)
+    sections = set(sessions.section_codes(i))
+    qualified = list(instance["qualified_for"].get((course_id, kind), ()))
+    slots = instance["slots"]
+    position = slots.position
+    usable = slots.mask_of(instance["timeslots"])
+    masks = instance["instructor_masks"]
+    preferences = instance.get("instructor_preferences", {})
+
+    items = []
+
+    # placed sessions in the way
+    qualified_set = set(qualified)
+    for j, (instructor, room, ts) in solution.items():
+        shares = bool(sections.intersection(sessions.section_codes(j)))
+        if not shares and instructor not in qualified_set:
+            continue
+        bit = slots.block(position[ts], sessions.duration[j])
+        holds = []
+        if shares:
+            holds.append("the section")
+        if instructor in qualified_set:
+            holds.append(instructor)
+        items.append({
+            "kind": "session", "session": j, "bit": bit,
+            "sections": bit if shares else 0,
+            "instructor": instructor if instructor in qualified_set else None,
+            "detail": f"{sessions.variable_name(j)} holds {' and '.join(holds)} at {slot_label(instance, ts)}",
+            "relax": f"move {sessions.variable_name(j)} out of {slot_label(instance, ts)}",
+        })
+
+    # slots with no room of the right type left
+    rooms = instance["lecture_rooms"] if kind == LECTURE else instance["lab_rooms"]
+    room_blocked = instance.get("room_blocked", {})
+    taken = defaultdict(int)
+    for j, (_, room, ts) in solution.items():
+        taken[room] |= slots.block(position[ts], sessions.duration[j])
+    room_name = SESSION_TYPES[kind].lower()
+    for ts in instance["timeslots"]:
+        bit = 1 << position[ts]
+        if all((taken[r] | room_blocked.get(r, 0)) & bit for r in rooms):
+            items.append({
+                "kind": "rooms", "bit": bit,
+                "detail": f"all {len(rooms)} {room_name} rooms are taken at {slot_label(instance, ts)}",
+                "relax": f"one more {room_name} room at {slot_label(instance, ts)}",
+            })
+
+    # instructors' own limits
+    for name in qualified:
+        mask = masks.get(name, slots.full) & usable
+        if mask != usable:
+            text = preferences.get(name, "")
+            items.append({
+                "kind": "preference", "instructor": name, "mask": mask,
+                "detail": f"{name} is only available in {popcount(mask)} of {popcount(usable)} slots"
+                          + (f" (PreferredSlots \"{text}\")" if text else ""),
+                "relax": f"drop or widen {name}'s PreferredSlots" + (f" \"{text}\"" if text else ""),
+            })
+        if name in blocks:
+            mask, reasons = blocks[name]
+            items.append({
+                "kind": "cap", "instructor": name, "mask": mask,
+                "detail": f"{name} can't fit it under their {', '.join(reasons)}",
+                "relax": f"raise {name}'s {'MaxPerWeek' if 'weekly' in reasons[0] else 'MaxPerDay'}",
+            })
+
+    return items, qualified, usable
+
+
+def make_check(items, qualified, usable, slots, duration=1):
+    # placeable(active) for a set of item indices in force
+    # (a multi-slot session needs a whole block free, rooms are still checked
+    # per slot, so "a room in every slot" stands in for "one room throughout")
+    full = slots.full
+
+    def placeable(active):
+        rooms_full = 0
+        sections_busy = 0
+        instructor_busy = defaultdict(int)
+        available = {}
+        blocked = defaultdict(int)
+        for k in active:
+            item = items[k]
+            kind = item["kind"]
+            if kind == "session":
+                sections_busy |= item["sections"]
+                if item["instructor"]:
+                    instructor_busy[item["instructor"]] |= item["bit"]
+            elif kind == "rooms":
+                rooms_full |= item["bit"]
+            elif kind == "preference":
+                available[item["instructor"]] = item["mask"]
+            else:
+                blocked[item["instructor"]] |= item["mask"]
+
+        free_slots = usable & ~rooms_full & ~sections_busy
+        for name in qualified:
+            free = available.get(name, full) & free_slots & ~instructor_busy[name] & ~blocked[name]
+            if slots.block_starts(free, duration):
+                return True
+        return False
+    return placeable
+
+
+def minimize_core(active, items, placeable):
+    # deletion-based: drop every item the session is still stuck without
+    # expensive items are tried first, so the core keeps the cheap ones
+    core = sorted(active, key=lambda k: -COSTS[items[k]["kind"]])
+    k = 0
+    while k < len(core):
+        rest = core[:k] + core[k + 1:]
+        if not placeable(rest):
+            core = rest
+        else:
+            k += 1
+    return core
+
+
+def explain_failure(i, sessions, instance, solution, blocks=None):
+    if blocks is None:
+        blocks = cap_blocks(sessions, solution, instance, sessions.duration[i])
+    explanation = {
+        "index": i,
+        "session": sessions.variable_name(i),
+        "course": sessions.course_id(i),
+        "type": sessions.session_type(i),
+        "core": [],
+        "relaxation": [],
+        "cost": 0,
+    }
+
+    items, qualified, usable = conflict_items(i, sessions, instance, solution, blocks)
+    if not qualified:
+        explanation["core"] = [f"nobody is qualified to teach {sessions.course_id(i)} {sessions.session_type(i)}"]
+        explanation["relaxation"] = [f"add {sessions.course_id(i)} to the QualifiedCourses of someone who can teach "
+                                     f"{'labs' if sessions.kind[i] == LAB else 'lectures'}"]
+        return explanation
+
+    duration = sessions.duration[i]
+    placeable = make_check(items, qualified, usable, instance["slots"], duration)
+    if not placeable(set()):
+        # stuck even with every item gone: the timeslots themselves don't fit it
+        # (all excluded, or no day with enough of them in a row)
+        if duration > 1 and usable:
+            explanation["core"] = [f"no day has {duration} consecutive timeslots left for it"]
+            explanation["relaxation"] = [f"restore timeslots so one day has {duration} in a row, "
+                                         f"or shorten its {'LabSlots' if sessions.kind[i] == LAB else 'LectureSlots'}"]
+        else:
+            explanation["core"] = ["there are no timeslots left to schedule it in"]
+            explanation["relaxation"] = ["restore some of the excluded timeslots"]
+        explanation["cost"] = COSTS["rooms"]
+        return explanation
+
+    active = set(range(len(items)))
+    if placeable(active):
+        # nothing is in the way any more - it lost out to the solving order
+        explanation["core"] = ["nothing in the final timetable blocks it, it lost out to the solving order"]
+        explanation["relaxation"] = ["solve again with a time budget (anytime mode) or another seed"]
+        return explanation
+
+    core = minimize_core(active, items, placeable)
+    explanation["core"] = [items[k]["detail"] for k in core]
+
+    # relax cheapest first: an item that frees the session on its own if there
+    # is one, otherwise the cheapest of the current core, then look again
+    relaxed = []
+    while not placeable(active):
+        singles = [k for k in core if placeable(active - {k})]
+        pick = min(singles or core, key=lambda k: COSTS[items[k]["kind"]])
+        active.discard(pick)
+        relaxed.append(pick)
+        if not placeable(active):
+            core = minimize_core(active, items, placeable)
+
+    explanation["relaxation"] = [items[k]["relax"] for k in relaxed]
+    explanation["cost"] = sum(COSTS[items[k]["kind"]] for k in relaxed)
+    return explanation
+
+
+def explain_failures(sessions, instance, solution, failed, time_budget=None):
+    # one explanation per failed session, cheapest fixes first
+    # time_budget: seconds, failures not reached by then get a placeholder
+    # (cap blocks depend on how many slots the session needs, so one set per length)
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    blocks = {}
+    explanations = []
+    for f in failed:
+        if deadline is not None and time.monotonic() > deadline:
+            explanations.append({
+                "index": f["index"], "session": f["session"], "course": f["course"], "type": f["type"],
+                "core": ["not explained - ran out of explanation time"], "relaxation": [], "cost": None,
+            })
+            continue
+        duration = sessions.duration[f["index"]]
+        if duration not in blocks:
+            blocks[duration] = cap_blocks(sessions, solution, instance, duration)
+        explanations.append(explain_failure(f["index"], sessions, instance, solution, blocks[duration]))
+    return sorted(explanations, key=lambda e: (e["cost"] is None, e["cost"] or 0))
+
+
+def report_explanations(explanations, limit=10):
+    if not explanations:
+        return
+    print(f"\n🔎 Why {len(explanations)} sessions couldn't be placed:")
+    for e in explanations[:limit]:
+        print(f"   - {e['session']} ({e['course']} - {e['type']})")
+        for reason in e["core"][:6]:
+            print(f"       because {reason}")
+        if len(e["core"]) > 6:
+            print(f"       ... and {len(e['core']) - 6} more")
+        if e["relaxation"]:
+            print(f"       fix: {'; '.join(e['relaxation'])}")
+    if len(explanations) > limit:
+        print(f"   ... and {len(explanations) - limit} more")
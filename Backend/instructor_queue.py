@@ -0,0 +1,147 @@
+import heapq
+import random
+from collections import Counter, defaultdict
+
+# load-aware instructor selection
+#
+# every (course, kind) has a heap of its qualified instructors keyed on
+#     (teaching load + expected share of remaining demand) / available slots
+# where the expected share is, over all courses they can teach, the sessions
+# still to place divided by how many people can teach them. Picking the lowest
+# key keeps people who are the only option for scarce courses free for those.
+# Only the instructor who just got a session is re-keyed: a push per heap
+# they're in, the old entries go stale and are popped when they reach the top
+# (a heap is rebuilt once its stale entries outnumber its live ones, so the
+# rebuilds are paid for by the pushes that made the entries stale).
+# Other people's share of the remaining demand catches up when they're re-keyed.
+# ranked() walks the heap best-first without popping the live entries, so
+# taking the top few candidates costs O(k log k), not a sort of the heap.
+#
+# it also enforces the daily / weekly caps: once someone hits a cap, the
+# slots of that day (or the whole week) are blocked for them
+
+
+STALE_MIN = 4   # a heap is rebuilt once it has more stale entries than this and its live ones
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+class InstructorQueue:
+
+    def __init__(self, sessions, instance, rng=None):
+        self.rng = rng or random
+        self.slots = instance["slots"]
+        self.timeslot_to_day = instance["timeslot_to_day"]
+        self.caps = instance.get("instructor_caps", {})
+        self.qualified_for = instance["qualified_for"]
+
+        usable = self.slots.mask_of(instance["timeslots"])
+        masks = instance["instructor_masks"]
+
+        # which heaps each instructor sits in
+        self.courses_of = defaultdict(list)
+        for key, names in self.qualified_for.items():
+            for name in names:
+                self.courses_of[name].append(key)
+
+        self.remaining = Counter()
+        for i in sessions:
+            self.remaining[(sessions.course_id(i), sessions.kind[i])] += 1
+
+        self.available = {}
+        for name in self.courses_of:
+            self.available[name] = popcount(masks.get(name, usable) & usable)
+        self.load = Counter()
+        self.day_load = Counter()
+        self.blocked_slots = defaultdict(int)
+        self.version = Counter()
+
+        self.heaps = {key: [] for key in self.qualified_for}
+        self.stale = Counter()
+        for name in self.courses_of:
+            self._push(name)
+
+    def priority(self, name):
+        share = 0.0
+        for key in self.courses_of[name]:
+            if self.remaining[key]:
+                share += self.remaining[key] / len(self.qualified_for[key])
+        available = self.available[name] - self.load[name]
+        if available <= 0:
+            return float("inf")
+        return (self.load[name] + share) / available
+
+    def _push(self, name):
+        self.version[name] += 1
+        entry = (self.priority(name), self.rng.random(), self.version[name], name)
+        for key in self.courses_of[name]:
+            heap = self.heaps[key]
+            heapq.heappush(heap, entry)
+            if entry[2] > 1:
+                self.stale[key] += 1
+                if self.stale[key] > max(STALE_MIN, len(self.qualified_for[key])):
+                    self._rebuild(key)
+
+    def _rebuild(self, key):
+        heap = [entry for entry in self.heaps[key] if entry[2] == self.version[entry[3]]]
+        heapq.heapify(heap)
+        self.heaps[key] = heap
+        self.stale[key] = 0
+
+    def ranked(self, course_id, kind):
+        # qualified instructors for this course, best pick first, lazily: the
+        # solvers usually stop at the first one or two
+        key = (course_id, kind)
+        heap = self.heaps.get(key, [])
+        while heap and heap[0][2] != self.version[heap[0][3]]:
+            heapq.heappop(heap)  # stale
+            self.stale[key] -= 1
+        # best-first walk over the heap's tree, smallest entry on the frontier next
+        # (the caller stops before the heap changes, after an assignment)
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            entry, k = heapq.heappop(frontier)
+            if entry[2] == self.version[entry[3]]:
+                yield entry[3]
+            for child in (2 * k + 1, 2 * k + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def blocked(self, name, duration=1):
+        # slots someone can't take any more because of their caps - a session
+        # of several slots also needs that much room left under the caps
+        if duration == 1:
+            return self.blocked_slots[name]
+        day_cap, week_cap = self.caps.get(name, (None, None))
+        if week_cap is not None and self.load[name] + duration > week_cap:
+            return self.slots.full
+        mask = self.blocked_slots[name]
+        if day_cap is not None:
+            for day, day_mask in self.slots.day_masks.items():
+                if self.day_load[(name, day)] + duration > day_cap:
+                    mask |= day_mask
+        return mask
+
+    def assigned(self, name, course_id, kind, timeslot, duration=1):
+        # load is counted in timeslots, so a double lab weighs twice
+        self.load[name] += duration
+        day = self.timeslot_to_day[timeslot]
+        self.day_load[(name, day)] += duration
+
+        day_cap, week_cap = self.caps.get(name, (None, None))
+        if day_cap is not None and self.day_load[(name, day)] >= day_cap:
+            self.blocked_slots[name] |= self.slots.day_masks.get(day, 0)
+        if week_cap is not None and self.load[name] >= week_cap:
+            self.blocked_slots[name] = self.slots.full
+
+        self.placed(course_id, kind)
+        self._push(name)
+
+    def placed(self, course_id, kind):
+        # one session of this course is done (placed or given up), so there's
+        # a bit less demand to share out (picked up as people are re-keyed)
+        key = (course_id, kind)
+        if self.remaining[key]:
+            self.remaining[key] -= 1
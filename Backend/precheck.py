@@ -0,0 +1,161 @@
+from collections import Counter
+from Backend.session_store import LECTURE, LAB, SESSION_TYPES
+
+# quick counting checks before solving - everything here is one pass over the
+# sessions, so shortfalls are reported in milliseconds with real numbers
+# instead of a long greedy run ending in "No valid combination found"
+# the checks are advisory: a shortfall means some sessions will stay unplaced,
+# only a "fatal" one (nothing at all can go anywhere) is worth not solving for
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def analyze_capacity(sessions, instance):
+    # returns a list of shortfalls, empty when nothing is obviously impossible
+    issues = []
+
+    timeslots = instance["timeslots"]
+    n_slots = len(timeslots)
+    slots = instance["slots"]
+    usable = slots.mask_of(timeslots)
+    qualified_for = instance["qualified_for"]
+    instructor_masks = instance["instructor_masks"]
+
+    caps = instance.get("instructor_caps", {})
+    n_days = len({instance["timeslot_to_day"][ts] for ts in timeslots})
+
+    def available(name):
+        # free slots, but never more than their teaching caps allow
+        have = popcount(instructor_masks.get(name, usable) & usable)
+        day_cap, week_cap = caps.get(name, (None, None))
+        if day_cap is not None:
+            have = min(have, day_cap * n_days)
+        if week_cap is not None:
+            have = min(have, week_cap)
+        return have
+
+    kind_count = Counter()
+    course_demand = Counter()
+    forced_load = Counter()
+    section_load = Counter()
+
+    # demand is counted in timeslots, a double lab needs two
+    too_long = Counter()
+    for i in sessions:
+        kind = sessions.kind[i]
+        key = (sessions.course_id(i), kind)
+        duration = sessions.duration[i]
+        kind_count[kind] += duration
+        course_demand[key] += duration
+        if duration > slots.longest_run:
+            too_long[key] += 1
+
+        qualified = qualified_for.get(key, ())
+        if len(qualified) == 1:
+            forced_load[qualified[0]] += duration
+
+        for s in sessions.section_codes(i):
+            section_load[s] += duration
+
+    # a block has to fit into one day
+    for (course_id, kind), count in sorted(too_long.items()):
+        issues.append({
+            "check": "block length",
+            "subject": f"{course_id} {SESSION_TYPES[kind]}",
+            "need": count,
+            "have": 0,
+            "detail": f"{count} sessions need more consecutive slots than any day has ({slots.longest_run})"
+        })
+
+    # rooms x timeslots per room type
+    # (minus the slots where a room is blocked, e.g. leased to someone else)
+    room_lists = {LECTURE: instance["lecture_rooms"], LAB: instance["lab_rooms"]}
+    room_blocked = instance.get("room_blocked", {})
+    places = {}
+    for kind, rooms in room_lists.items():
+        have = sum(n_slots - popcount(room_blocked.get(r, 0) & usable) for r in rooms)
+        places[kind] = have
+        need = kind_count[kind]
+        if need > have:
+            issues.append({
+                "check": "rooms",
+                "subject": f"{SESSION_TYPES[kind]} rooms",
+                "need": need,
+                "have": have,
+                "detail": f"{need} {SESSION_TYPES[kind].lower()} session slots but only "
+                          f"{len(rooms)} rooms x {n_slots} timeslots = {have} places"
+                          + (" (after blocked slots)" if room_blocked else "")
+            })
+
+    # no place for any session at all - nothing to gain from solving
+    if kind_count and all(places[kind] == 0 for kind in kind_count):
+        for issue in issues:
+            if issue["check"] == "rooms":
+                issue["fatal"] = True
+
+    # every course needs someone who can teach it, with enough free slots in total
+    for (course_id, kind), need in sorted(course_demand.items()):
+        qualified = qualified_for.get((course_id, kind), ())
+        have = sum(available(name) for name in qualified)
+        if not qualified:
+            issues.append({
+                "check": "instructors",
+                "subject": f"{course_id} {SESSION_TYPES[kind]}",
+                "need": need,
+                "have": 0,
+                "detail": f"{need} session slots but nobody is qualified to teach them"
+            })
+        elif need > have:
+            issues.append({
+                "check": "instructors",
+                "subject": f"{course_id} {SESSION_TYPES[kind]}",
+                "need": need,
+                "have": have,
+                "detail": f"{need} session slots but the {len(qualified)} qualified instructors "
+                          f"are only available in {have} slots in total"
+            })
+
+    # instructors who are the only option for some courses
+    for name, need in sorted(forced_load.items()):
+        have = available(name)
+        if need > have:
+            issues.append({
+                "check": "forced load",
+                "subject": name,
+                "need": need,
+                "have": have,
+                "detail": f"only qualified instructor for {need} session slots but available in {have} slots"
+            })
+
+    # a section can't have more sessions than there are timeslots
+    for s, need in sorted(section_load.items()):
+        if need > n_slots:
+            issues.append({
+                "check": "section load",
+                "subject": sessions.section_names[s],
+                "need": need,
+                "have": n_slots,
+                "detail": f"{need} session slots but only {n_slots} timeslots in the week"
+            })
+
+    return issues
+
+
+def hopeless(issues):
+    # only these stop a solve, every other shortfall just costs some sessions
+    return any(issue.get("fatal") for issue in issues)
+
+
+def report_issues(issues):
+    if not issues:
+        print("✅ Pre-check passed: no resource shortfalls found")
+        return
+
+    print(f"⚠️ Pre-check found {len(issues)} shortfalls, some sessions will stay unplaced:")
+    for issue in issues[:20]:
+        print(f"   - [{issue['check']}] {issue['subject']}: {issue['detail']} "
+              f"(short by {issue['need'] - issue['have']})")
+    if len(issues) > 20:
+        print(f"   ... and {len(issues) - 20} more")
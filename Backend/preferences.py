@@ -0,0 +1,320 @@
+import re
+from datetime import datetime
+
+# compile the free-text PreferredSlots column into one bit mask per instructor
+# bit k of a mask is set when the instructor is available in timeslot k
+#
+# supported expressions (case-insensitive, clauses split on "," or ";"):
+#   "Any time"                         -> every slot
+#   "Not on Tuesday"                   -> everything except Tuesday
+#   "Not on Sundays" / "No Mondays"    -> plural day names work too
+#   "Not on Sunday, Monday"            -> a clause without its own prefix keeps
+#                                         the polarity of the clause before it
+#   "Only Sunday, Monday"              -> just those days
+#   "Not TS3; not TS7"                 -> explicit slot ids
+#   "Not before 10:45 AM"              -> time ranges: before/after/"A - B"
+#   "Wednesday 9:00 AM - 12:15 PM"     -> day and time combined in one clause
+#   "Mornings" / "Not afternoons"      -> start before / from 12:00 PM
+#   "Any time except Sunday"           -> "except" / "but not" inside a clause
+#                                         starts a negative one
+# a clause none of this fits is unreadable: validate_data rejects the file
+
+DAY_NAMES = {
+    "sunday": "Sunday", "sun": "Sunday",
+    "monday": "Monday", "mon": "Monday",
+    "tuesday": "Tuesday", "tue": "Tuesday", "tues": "Tuesday",
+    "wednesday": "Wednesday", "wed": "Wednesday",
+    "thursday": "Thursday", "thu": "Thursday", "thurs": "Thursday",
+    "friday": "Friday", "fri": "Friday",
+    "saturday": "Saturday", "sat": "Saturday",
+}
+
+ANY_TIME = ("any", "any time", "anytime")
+NEGATIVE_PREFIXES = ("not on", "not", "except", "no", "unavailable")
+POSITIVE_PREFIXES = ("only on", "only", "on", "available")
+
+TIME_RE = r"\d{1,2}(?::\d{2})?\s*[ap]\.?m\.?"
+RANGE_RE = re.compile(rf"({TIME_RE})\s*(?:-|–|to)\s*({TIME_RE})")
+EXCEPT_RE = re.compile(r"\s+(?:except|but not)\s+")
+BEFORE_RE = re.compile(rf"before\s+({TIME_RE})")
+AFTER_RE = re.compile(rf"after\s+({TIME_RE})")
+SLOT_RE = re.compile(r"\bts\d+\b")
+WORD_RE = re.compile(r"[a-z]+")
+NOON = datetime.strptime("12:00 PM", "%I:%M %p")
+
+
+def day_name(word):
+    # "monday", "mon", "mondays" -> "Monday", None for anything else
+    if word in DAY_NAMES:
+        return DAY_NAMES[word]
+    if word.endswith("s"):
+        return DAY_NAMES.get(word[:-1])
+    return None
+
+
+def parse_clock(text):
+    # "9:00 AM", "9am", "2:15 p.m." -> datetime on a dummy date
+    text = text.replace(".", "").replace(" ", "").upper()
+    for fmt in ("%I:%M%p", "%I%p"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"Bad time: {text}")
+
+
+class SlotIndex:
+    # precomputed per-timeslot info that the compiler and the solvers share
+
+    def __init__(self, times_df):
+        self.ids = [str(ts) for ts in times_df["TimeSlotID"]]
+        self.position = {ts: k for k, ts in enumerate(self.ids)}
+        self.days = [str(d) for d in times_df["Day"]]
+        self.starts = [parse_clock(str(t)) for t in times_df["StartTime"]]
+        self.ends = [parse_clock(str(t)) for t in times_df["EndTime"]]
+        self.full = (1 << len(self.ids)) - 1
+
+        self.day_masks = {}
+        for k, day in enumerate(self.days):
+            self.day_masks[day] = self.day_masks.get(day, 0) | (1 << k)
+
+        # consecutive slots: neighbours in a day's slots sorted by start time
+        self.next_position = [None] * len(self.ids)
+        by_day = {}
+        for k, day in enumerate(self.days):
+            by_day.setdefault(day, []).append(k)
+        for run in by_day.values():
+            run.sort(key=lambda k: self.starts[k])
+            for a, b in zip(run, run[1:]):
+                self.next_position[a] = b
+        self.longest_run = max((len(run) for run in by_day.values()), default=0)
+        # when every day is a run of adjacent bits, blocks are found by shifting
+        self.contiguous = all(b is None or b == a + 1 for a, b in enumerate(self.next_position))
+        self._start_masks = {}
+
+    def bit(self, ts_id):
+        return 1 << self.position[ts_id]
+
+    def mask_of(self, ts_ids):
+        mask = 0
+        for ts in ts_ids:
+            mask |= 1 << self.position[ts]
+        return mask
+
+    def block(self, position, length):
+        # mask of `length` consecutive slots from `position` on, 0 if the day ends first
+        mask = 0
+        k = position
+        for _ in range(length):
+            if k is None:
+                return 0
+            mask |= 1 << k
+            k = self.next_position[k]
+        return mask
+
+    def block_slots(self, ts_id, length):
+        # slot IDs of the block starting at ts_id, in time order
+        out = []
+        k = self.position[ts_id]
+        for _ in range(length):
+            if k is None:
+                break
+            out.append(self.ids[k])
+            k = self.next_position[k]
+        return out
+
+    def block_starts(self, free, length):
+        # start positions (as a mask) of every block of `length` slots lying
+        # completely inside `free` - sliding windows over each day's slots
+        if length == 1:
+            return free
+        if length not in self._start_masks:
+            blocks = [(k, self.block(k, length)) for k in range(len(self.ids))]
+            blocks = [(k, m) for k, m in blocks if m]
+            start_ok = 0
+            for k, _ in blocks:
+                start_ok |= 1 << k
+            self._start_masks[length] = (start_ok, blocks)
+        start_ok, blocks = self._start_masks[length]
+        if self.contiguous:
+            starts = free & start_ok
+            for shift in range(1, length):
+                starts &= free >> shift
+            return starts
+        starts = 0
+        for k, m in blocks:
+            if free & m == m:
+                starts |= 1 << k
+        return starts
+
+    def time_mask(self, keep):
+        mask = 0
+        for k in range(len(self.ids)):
+            if keep(self.starts[k], self.ends[k]):
+                mask |= 1 << k
+        return mask
+
+
+def split_prefix(clause):
+    for prefix in NEGATIVE_PREFIXES:
+        if clause == prefix or clause.startswith(prefix + " "):
+            return False, clause[len(prefix):].strip()
+    for prefix in POSITIVE_PREFIXES:
+        if clause == prefix or clause.startswith(prefix + " "):
+            return True, clause[len(prefix):].strip()
+    return None, clause
+
+
+def clause_mask(clause, slots):
+    # mask of the slots a single clause talks about, or None if we can't read it
+    if clause in ANY_TIME:
+        return slots.full
+    parts = []
+
+    slot_ids = [ts for ts in slots.ids if re.search(rf"\b{re.escape(ts.lower())}\b", clause)]
+    if SLOT_RE.search(clause):
+        parts.append(slots.mask_of(slot_ids))
+        clause = SLOT_RE.sub(" ", clause)
+
+    time_mask = None
+    match = RANGE_RE.search(clause)
+    if match:
+        lo, hi = parse_clock(match.group(1)), parse_clock(match.group(2))
+        time_mask = slots.time_mask(lambda s, e: s >= lo and e <= hi)
+        clause = clause.replace(match.group(0), " ")
+    match = BEFORE_RE.search(clause)
+    if match:
+        limit = parse_clock(match.group(1))
+        time_mask = slots.time_mask(lambda s, e: e <= limit)
+        clause = clause.replace(match.group(0), " ")
+    match = AFTER_RE.search(clause)
+    if match:
+        limit = parse_clock(match.group(1))
+        time_mask = slots.time_mask(lambda s, e: s >= limit)
+        clause = clause.replace(match.group(0), " ")
+
+    day_mask = None
+    for word in WORD_RE.findall(clause):
+        day = day_name(word)
+        if day:
+            day_mask = (day_mask or 0) | slots.day_masks.get(day, 0)
+        elif word in ("morning", "mornings"):
+            time_mask = slots.time_mask(lambda s, e: s < NOON)
+        elif word in ("afternoon", "afternoons"):
+            time_mask = slots.time_mask(lambda s, e: s >= NOON)
+        elif word not in ("and", "or", "the", "days", "day", "slots", "slot", "at", "from", "in"):
+            return None
+
+    if day_mask is not None:
+        parts.append(day_mask)
+    if time_mask is not None:
+        parts.append(time_mask)
+
+    if not parts:
+        return None
+
+    mask = slots.full
+    for part in parts:
+        mask &= part
+    return mask
+
+
+def read_preference(text, slots):
+    # one PreferredSlots value -> (availability mask, clauses it can't read)
+    text = str(text).strip().lower()
+    if text in ("", "nan", "none", "<na>") or text in ANY_TIME:
+        return slots.full, []
+
+    allowed = 0
+    blocked = 0
+    has_positive = False
+    positive = None
+    unreadable = []
+
+    # "a except b" is read as the clauses "a" and "except b"
+    text = EXCEPT_RE.sub(", except ", text)
+    for raw in re.split(r"[;,]|\band\b", text):
+        clause = raw.strip()
+        if not clause:
+            continue
+
+        sign, body = split_prefix(clause)
+        if sign is None:
+            # no prefix: same polarity as the clause before, positive at the start
+            sign = True if positive is None else positive
+        positive = sign
+
+        mask = clause_mask(body, slots)
+        if mask is None:
+            unreadable.append(clause)
+            continue
+
+        if sign:
+            has_positive = True
+            allowed |= mask
+        else:
+            blocked |= mask
+
+    if not has_positive:
+        allowed = slots.full
+
+    return allowed & ~blocked & slots.full, unreadable
+
+
+def compile_preference(text, slots):
+    # one PreferredSlots value -> availability mask over all timeslots
+    mask, unreadable = read_preference(text, slots)
+    for clause in unreadable:
+        print(f"⚠️ Warning: Can't understand preference '{clause}' - ignoring it")
+    return mask
+
+
+def compile_preferences(instructors_df, slots):
+    # name -> availability mask for every instructor
+    masks = {}
+    for name, pref in zip(instructors_df["Name"], instructors_df["PreferredSlots"]):
+        mask = compile_preference(pref, slots)
+        if mask == 0:
+            print(f"⚠️ Warning: {name} is not available in any timeslot")
+        masks[name] = mask
+    return masks
+
+
+def self_check():
+    # python -m Backend.preferences - quick checks of the compiler on a small week
+    import pandas as pd
+    times_df = pd.DataFrame({
+        "Day": ["Sunday"] * 2 + ["Monday"] * 2 + ["Tuesday"] * 2,
+        "StartTime": ["9:00 AM", "12:30 PM"] * 3,
+        "EndTime": ["10:30 AM", "2:00 PM"] * 3,
+        "TimeSlotID": [f"TS{k}" for k in range(6)],
+    })
+    slots = SlotIndex(times_df)
+    cases = [
+        ("Any time", 0b111111),
+        ("", 0b111111),
+        ("Not on Sunday", 0b111100),
+        ("Not on Sundays", 0b111100),
+        ("No Mondays", 0b110011),
+        ("Not on Sun, Tues", 0b001100),
+        ("Only Mondays", 0b001100),
+        ("Not TS1; not TS4", 0b101101),
+        ("Mornings", 0b010101),
+        ("Not before 12:00 PM", 0b101010),
+        ("Tuesdays 9:00 AM - 10:30 AM", 0b010000),
+        ("Any time except Sunday", 0b111100),
+        ("Any time except Sun, Mon", 0b110000),
+        ("Mornings except Monday", 0b010001),
+        ("Only Sunday but not TS1", 0b000001),
+    ]
+    for text, expected in cases:
+        got, unreadable = read_preference(text, slots)
+        assert not unreadable, f"{text!r}: can't read {unreadable}"
+        assert got == expected, f"{text!r}: got {got:06b}, expected {expected:06b}"
+    for text in ("Whenever", "Any time except holidays"):
+        assert read_preference(text, slots)[1], f"{text!r}: should be unreadable"
+    print(f"✅ {len(cases) + 2} preference checks passed")
+
+
+if __name__ == "__main__":
+    self_check()
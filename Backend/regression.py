@@ -0,0 +1,279 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import statistics
+import tracemalloc
+import pandas as pd
+from Backend.data_loader import load_data, build_sessions, define_groups
+from Backend.csp_model import prepare_instance, build_timetable
+from Backend.solver import solve_sessions, SOLVER_MODES
+from Backend.anytime import solve_anytime
+from Backend.scoring import soft_score
+
+# performance regression check against a committed baseline
+#
+# every (instance, mode) pair is solved with a fixed seed and gives
+#   runtime     - seconds from the loaded tables to the timetable (sessions,
+#                 instance, solve, build), the median of --repeats runs
+#   memory      - peak traced allocation of one more run, in KiB
+#   scheduled   - sessions placed
+#   soft_score  - scoring.soft_score of the solution
+# and is compared with Backend/regression_baseline.json. Instances are the
+# bundled CSV/ data and scaled copies of it: "x<k>" is k departments' worth of
+# the same courses, instructors, rooms and sections over the shared timeslots.
+# Modes are the solver modes plus "anytime": a greedy start and a fixed number
+# of anytime steps (not a time budget, so the score doesn't depend on the
+# machine's speed - the budget only stops a run that hangs).
+# Nothing leaves the machine, solves run in this process (workers=1).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, "Backend", "regression_baseline.json")
+
+INSTANCES = ["base", "x2", "x4", "x8"]
+MODES = SOLVER_MODES + ["anytime"]
+SEED = 7
+ANYTIME_STEPS = 20
+ANYTIME_BUDGET = 60
+
+# allowed slack before a change counts as a regression
+TOLERANCES = {
+    "runtime": 0.5,          # relative: up to 50% slower
+    "runtime_slack": 0.05,   # plus this many seconds, timer noise on tiny runs
+    "memory": 0.25,          # relative: up to 25% more peak memory
+    "scheduled": 0,          # sessions fewer
+    "soft_score": 0,         # points lower
+}
+
+
+def scale_data(data, factor):
+    # data with `factor` copies of everything but the timeslots, copy k gets
+    # "_x<k>" on its ids and " (x<k>)" on instructor names
+    if factor == 1:
+        return data
+
+    groups = define_groups(data["sections"])
+    group_of = {sec: group for group, secs in groups.items() for sec in secs}
+
+    def rename(ids, k):
+        return ",".join(f"{c.strip()}_X{k}" for c in str(ids).split(","))
+
+    courses, instructors, rooms, sections = [], [], [], []
+    for k in range(1, factor + 1):
+        df = data["courses"].copy()
+        if k > 1:
+            df["CourseID"] = df["CourseID"] + f"_X{k}"
+        courses.append(df)
+
+        df = data["instructors"].copy()
+        if k > 1:
+            df["InstructorID"] = df["InstructorID"] + f"_x{k}"
+            df["Name"] = df["Name"] + f" (x{k})"
+            df["QualifiedCourses"] = df["QualifiedCourses"].map(lambda ids: rename(ids, k))
+        instructors.append(df)
+
+        df = data["rooms"].copy()
+        if k > 1:
+            df["RoomID"] = df["RoomID"] + f"_x{k}"
+        rooms.append(df)
+
+        df = data["sections"].copy()
+        df["Group"] = df["SectionID"].map(group_of)
+        if k > 1:
+            df["SectionID"] = df["SectionID"] + f"_x{k}"
+            df["Group"] = df["Group"] + f"_x{k}"
+            df["Courses"] = df["Courses"].map(lambda ids: rename(ids, k))
+        sections.append(df)
+
+    return {
+        "courses": pd.concat(courses, ignore_index=True),
+        "instructors": pd.concat(instructors, ignore_index=True),
+        "rooms": pd.concat(rooms, ignore_index=True),
+        "timeslots": data["timeslots"],
+        "sections": pd.concat(sections, ignore_index=True),
+    }
+
+
+def instance_factor(name):
+    if name == "base":
+        return 1
+    if name.startswith("x") and name[1:].isdigit() and int(name[1:]) > 0:
+        return int(name[1:])
+    raise ValueError(f"Unknown instance: {name} (use base or x<k>)")
+
+
+def run_once(data, mode, seed):
+    with contextlib.redirect_stdout(io.StringIO()):
+        sessions = build_sessions(data)
+    instance = prepare_instance(data)
+    if mode == "anytime":
+        (solution, _, _), _ = solve_anytime(sessions, instance, ANYTIME_BUDGET, seed=seed, checkpoint_path=None,
+                                            verbose=False, workers=1, max_iterations=ANYTIME_STEPS)
+    else:
+        solution, _, _ = solve_sessions(sessions, instance, mode, seed, verbose=False, workers=1)
+    build_timetable(sessions, solution, instance)
+    return sessions, instance, solution
+
+
+def measure(data, mode, seed=SEED, repeats=3):
+    # one result dict for a (data, mode) pair
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        sessions, instance, solution = run_once(data, mode, seed)
+        times.append(time.perf_counter() - start)
+
+    # tracing slows everything down, so memory gets a run of its own
+    tracemalloc.start()
+    try:
+        run_once(data, mode, seed)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "sessions": len(sessions),
+        "runtime": round(statistics.median(times), 4),
+        "memory": round(peak / 1024),
+        "scheduled": len(solution),
+        "soft_score": soft_score(sessions, solution, instance),
+    }
+
+
+def run_benchmarks(instances=INSTANCES, modes=MODES, seed=SEED, repeats=3, base_path=None, verbose=True):
+    # {"<instance>/<mode>": result}
+    data = load_data(base_path=base_path, verbose=False)
+    results = {}
+    for name in instances:
+        scaled = scale_data(data, instance_factor(name))
+        for mode in modes:
+            result = measure(scaled, mode, seed, repeats)
+            results[f"{name}/{mode}"] = result
+            if verbose:
+                print(f"   {name}/{mode}: {result['scheduled']}/{result['sessions']} sessions, "
+                      f"score {result['soft_score']}, {result['runtime']:.3f}s, {result['memory']} KiB")
+    return results
+
+
+def compare(baseline, results, tolerances):
+    # (regressions, notes) - one message per metric that got worse beyond its
+    # tolerance, notes for improvements worth a baseline update
+    regressions, notes = [], []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            notes.append(f"{key}: not in the baseline")
+            continue
+        if new["sessions"] != old["sessions"]:
+            regressions.append(f"{key}: instance has {new['sessions']} sessions, baseline {old['sessions']}")
+            continue
+
+        runtime_limit = old["runtime"] * (1 + tolerances["runtime"]) + tolerances["runtime_slack"]
+        if new["runtime"] > runtime_limit:
+            regressions.append(f"{key}: runtime {new['runtime']:.3f}s, baseline {old['runtime']:.3f}s "
+                               f"(limit {runtime_limit:.3f}s)")
+        elif new["runtime"] < old["runtime"] / (1 + tolerances["runtime"]):
+            notes.append(f"{key}: runtime {new['runtime']:.3f}s, baseline {old['runtime']:.3f}s")
+
+        memory_limit = old["memory"] * (1 + tolerances["memory"])
+        if new["memory"] > memory_limit:
+            regressions.append(f"{key}: peak memory {new['memory']} KiB, baseline {old['memory']} KiB "
+                               f"(limit {memory_limit:.0f} KiB)")
+
+        for metric in ("scheduled", "soft_score"):
+            if new[metric] < old[metric] - tolerances[metric]:
+                regressions.append(f"{key}: {metric} {new[metric]}, baseline {old[metric]}")
+            elif new[metric] > old[metric]:
+                notes.append(f"{key}: {metric} {new[metric]}, baseline {old[metric]}")
+    return regressions, notes
+
+
+def read_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_baseline(path, results, seed, repeats, tolerances):
+    baseline = {
+        "seed": seed,
+        "repeats": repeats,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "tolerances": tolerances,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare solver runtime, memory and quality with the baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--instances", nargs="+", default=None, help="base and/or x<k> (default the baseline's)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=None)
+    parser.add_argument("--seed", type=int, default=None, help=f"random seed (default the baseline's or {SEED})")
+    parser.add_argument("--repeats", type=int, default=None, help="timed runs per pair, the median counts")
+    parser.add_argument("--csv-dir", default=None, help="folder with the reference CSVs (default CSV/)")
+    parser.add_argument("--runtime-tolerance", type=float, default=None, help="allowed relative slowdown")
+    parser.add_argument("--memory-tolerance", type=float, default=None, help="allowed relative memory growth")
+    parser.add_argument("--scheduled-tolerance", type=int, default=None, help="allowed drop in placed sessions")
+    parser.add_argument("--score-tolerance", type=int, default=None, help="allowed drop in soft score")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    baseline = read_baseline(args.baseline) if os.path.exists(args.baseline) else None
+    if baseline is None and not args.update:
+        print(f"❌ No baseline at {args.baseline} (run with --update to record one)")
+        return 2
+
+    # the baseline's own settings unless overridden, so runs stay comparable
+    stored = baseline or {}
+    seed = args.seed if args.seed is not None else stored.get("seed", SEED)
+    repeats = args.repeats or stored.get("repeats", 3)
+    tolerances = dict(TOLERANCES, **stored.get("tolerances", {}))
+    for key, value in (("runtime", args.runtime_tolerance), ("memory", args.memory_tolerance),
+                       ("scheduled", args.scheduled_tolerance), ("soft_score", args.score_tolerance)):
+        if value is not None:
+            tolerances[key] = value
+
+    # a check runs what the baseline has, an update the defaults
+    keys = [] if args.update else list(stored.get("results", {}))
+    instances = args.instances or list(dict.fromkeys(k.split("/")[0] for k in keys)) or INSTANCES
+    modes = args.modes or list(dict.fromkeys(k.split("/")[1] for k in keys)) or MODES
+
+    print(f"⏱️ Benchmarking {', '.join(instances)} x {', '.join(modes)} (seed {seed}, {repeats} runs each)...")
+    try:
+        results = run_benchmarks(instances, modes, seed, repeats, args.csv_dir)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.update:
+        write_baseline(args.baseline, results, seed, repeats, tolerances)
+        print(f"✅ Baseline written to {args.baseline}")
+        return 0
+
+    regressions, notes = compare(baseline["results"], results, tolerances)
+    for note in notes:
+        print(f"   ℹ️ {note}")
+    if regressions:
+        print(f"❌ {len(regressions)} regressions:")
+        for message in regressions:
+            print(f"   - {message}")
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
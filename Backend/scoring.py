@@ -0,0 +1,36 @@
+from collections import defaultdict
+
+# soft quality of a (partial) solution - higher is better
+#   + one point for every distinct day a group has classes on (the greedy
+#     solver spreads groups over the week on purpose)
+#   - one point for every idle slot between two classes of a section on a day
+
+
+def soft_score(sessions, solution, instance):
+    timeslot_to_day = instance["timeslot_to_day"]
+    slots = instance["slots"]
+    position = slots.position
+
+    group_days = defaultdict(set)
+    section_day_slots = defaultdict(list)
+
+    for i, (_, _, timeslot) in solution.items():
+        day = timeslot_to_day[timeslot]
+        group_days[sessions.group[i]].add(day)
+        taken = [position[ts] for ts in slots.block_slots(timeslot, sessions.duration[i])]
+        for s in sessions.section_codes(i):
+            section_day_slots[(s, day)].extend(taken)
+
+    spread = sum(len(days) for days in group_days.values())
+
+    gaps = 0
+    for taken in section_day_slots.values():
+        if len(taken) > 1:
+            gaps += max(taken) - min(taken) + 1 - len(set(taken))
+
+    return spread - gaps
+
+
+def evaluate(sessions, solution, instance):
+    # (scheduled sessions, soft score) - compare tuples, more scheduled wins first
+    return len(solution), soft_score(sessions, solution, instance)
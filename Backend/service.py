@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from Backend.data_loader import load_data, build_sessions
+from Backend.csp_model import prepare_instance, restrict_instance, build_timetable
+from Backend.solver import solve_sessions
+from Backend.explain import explain_failures, explain_budget
+from Backend.validator import find_conflicts
+from Backend.precheck import analyze_capacity
+
+# small local HTTP/JSON service that keeps the parsed instance warm
+#
+#   GET  /health              -> {"status": "ok", ...}
+#   GET  /instance            -> sizes of the loaded instance
+#   GET  /precheck            -> capacity shortfalls of the loaded instance
+#   POST /solve               -> {"seed": 1, "mode": "greedy" | "two_phase"}
+#   POST /resolve             -> {"seed": 1, "mode": ..., "exclude_rooms": [...],
+#                                 "exclude_instructors": [...], "exclude_timeslots": [...]}
+#   POST /validate            -> {"timetable": [{"SectionID": ..., ...}, ...]}
+#   POST /reload              -> re-read the CSV folder
+#
+# solves run in a process pool, every worker gets the instance once at start-up
+
+DEFAULT_PORT = 8765
+
+# per-worker copy of the instance, filled in by init_worker
+_worker_state = {}
+
+
+def init_worker(sessions, instance):
+    _worker_state["sessions"] = sessions
+    _worker_state["instance"] = instance
+
+
+def solve_in_worker(seed=None, mode="greedy", exclude_rooms=(), exclude_instructors=(), exclude_timeslots=()):
+    sessions = _worker_state["sessions"]
+    instance = _worker_state["instance"]
+
+    if exclude_rooms or exclude_instructors or exclude_timeslots:
+        instance = restrict_instance(instance, exclude_rooms, exclude_instructors, exclude_timeslots)
+
+    start = time.perf_counter()
+    # we're already one of several worker processes, so no nested pool here
+    solution, failed, _ = solve_sessions(sessions, instance, mode, seed, verbose=False, workers=1)
+    solve_seconds = time.perf_counter() - start
+    timetable_df = build_timetable(sessions, solution, instance)
+    explanations = explain_failures(sessions, instance, solution, failed, time_budget=explain_budget(solve_seconds))
+
+    return {
+        "scheduled": len(solution),
+        "total": len(sessions),
+        "failed": [{k: v for k, v in f.items() if k != "index"} for f in failed],
+        "explanations": [{k: v for k, v in e.items() if k != "index"}
+                         for e in explanations],
+        "timetable": timetable_df.to_dict(orient="records"),
+        "solve_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+class SolverService:
+    # holds the loaded instance and the worker pool, shared by all handler threads
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.lock = threading.Lock()
+        self.pool = None
+        self.load()
+
+    def load(self):
+        data = load_data()
+        sessions = build_sessions(data)
+        instance = prepare_instance(data)
+
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                   initargs=(sessions, instance))
+        with self.lock:
+            old_pool = self.pool
+            self.data, self.sessions, self.instance, self.pool = data, sessions, instance, pool
+            self.loaded_at = time.time()
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def summary(self):
+        return {
+            "sessions": len(self.sessions),
+            "sections": len(self.sessions.section_names),
+            "instructors": len(self.instance["instructor_courses"]),
+            "lecture_rooms": len(self.instance["lecture_rooms"]),
+            "lab_rooms": len(self.instance["lab_rooms"]),
+            "timeslots": len(self.instance["timeslots"]),
+            "loaded_at": self.loaded_at,
+            "workers": self.workers,
+        }
+
+    def solve(self, seed=None, mode="greedy", **what_if):
+        # submit under the lock so a /reload can't shut the pool down in between
+        # (shutdown(wait=False) still lets already submitted solves finish)
+        with self.lock:
+            future = self.pool.submit(solve_in_worker, seed, mode, **what_if)
+        return future.result()
+
+    def validate(self, rows):
+        timetable_df = pd.DataFrame(rows)
+        missing = {"SectionID", "CourseID", "SessionType", "Instructor", "Room", "TimeSlot"} - set(timetable_df.columns)
+        if rows and missing:
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+        conflicts = find_conflicts(timetable_df, self.instance)
+        return {"valid": not conflicts, "conflicts": conflicts}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def string_list(payload, key):
+    # a list of strings from the request, anything else is the client's mistake
+    value = payload.get(key, [])
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{key} must be a list of strings")
+    return value
+
+
+def make_handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if not length:
+                return {}
+            payload = json.loads(self.rfile.read(length))
+            if not isinstance(payload, dict):
+                raise ValueError("Request body must be a JSON object")
+            return payload
+
+        def do_GET(self):
+            if self.path == "/health":
+                self.send_json(200, {"status": "ok", "loaded_at": service.loaded_at})
+            elif self.path == "/instance":
+                self.send_json(200, service.summary())
+            elif self.path == "/precheck":
+                issues = analyze_capacity(service.sessions, service.instance)
+                self.send_json(200, {"feasible": not issues, "issues": issues})
+            else:
+                self.send_json(404, {"error": f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            start = time.perf_counter()
+            try:
+                payload = self.read_json()
+
+                if self.path == "/solve":
+                    result = service.solve(payload.get("seed"), payload.get("mode", "greedy"))
+                elif self.path == "/resolve":
+                    result = service.solve(
+                        payload.get("seed"),
+                        payload.get("mode", "greedy"),
+                        exclude_rooms=string_list(payload, "exclude_rooms"),
+                        exclude_instructors=string_list(payload, "exclude_instructors"),
+                        exclude_timeslots=string_list(payload, "exclude_timeslots"),
+                    )
+                elif self.path == "/validate":
+                    result = service.validate(payload.get("timetable", []))
+                elif self.path == "/reload":
+                    service.load()
+                    result = service.summary()
+                else:
+                    self.send_json(404, {"error": f"Unknown path: {self.path}"})
+                    return
+            except (ValueError, TypeError, KeyError) as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                self.send_json(500, {"error": str(e)})
+                return
+
+            result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self.send_json(200, result)
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"🌐 {self.address_string()} {format % args}\n")
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the timetable solver as a local JSON service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="solver processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    service = SolverService(args.workers)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"🚀 Solver service on http://{args.host}:{args.port} with {service.workers} workers")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
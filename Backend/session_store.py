@@ -0,0 +1,101 @@
+from array import array
+
+# session kinds are stored as small ints instead of strings
+LECTURE = 0
+LAB = 1
+SESSION_TYPES = ("Lecture", "Lab")
+VARIABLE_SUFFIX = ("LEC", "LAB")
+
+
+class SessionStore:
+    # compact struct-of-arrays store for all the sessions we need to schedule
+    # course/group/kind are int codes into the name tables, and the sections
+    # of session i live in sec_idx[sec_ptr[i]:sec_ptr[i + 1]] (CSR layout)
+    # duration[i] is how many consecutive timeslots session i takes (usually 1)
+
+    __slots__ = (
+        "course_names", "group_names", "section_names",
+        "course", "group", "kind", "duration", "sec_ptr", "sec_idx",
+        "_course_codes", "_group_codes", "_section_codes",
+    )
+
+    def __init__(self):
+        self.course_names = []
+        self.group_names = []
+        self.section_names = []
+
+        self.course = array("i")
+        self.group = array("i")
+        self.kind = array("b")
+        self.duration = array("b")
+        self.sec_ptr = array("i", [0])
+        self.sec_idx = array("i")
+
+        self._course_codes = {}
+        self._group_codes = {}
+        self._section_codes = {}
+
+    def __len__(self):
+        return len(self.course)
+
+    def __iter__(self):
+        return iter(range(len(self.course)))
+
+    def __getstate__(self):
+        # the reverse lookups are rebuilt on load, so workers get a smaller payload
+        return (self.course_names, self.group_names, self.section_names,
+                self.course, self.group, self.kind, self.duration, self.sec_ptr, self.sec_idx)
+
+    def __setstate__(self, state):
+        (self.course_names, self.group_names, self.section_names,
+         self.course, self.group, self.kind, self.duration, self.sec_ptr, self.sec_idx) = state
+        self._course_codes = {name: i for i, name in enumerate(self.course_names)}
+        self._group_codes = {name: i for i, name in enumerate(self.group_names)}
+        self._section_codes = {name: i for i, name in enumerate(self.section_names)}
+
+    @staticmethod
+    def _intern(name, names, codes):
+        code = codes.get(name)
+        if code is None:
+            code = len(names)
+            names.append(name)
+            codes[name] = code
+        return code
+
+    def section_code(self, section_id):
+        return self._intern(section_id, self.section_names, self._section_codes)
+
+    def add(self, group_name, course_id, kind, sections, duration=1):
+        # append one session and return its index
+        self.course.append(self._intern(course_id, self.course_names, self._course_codes))
+        self.group.append(self._intern(group_name, self.group_names, self._group_codes))
+        self.kind.append(kind)
+        self.duration.append(duration)
+        for sec_id in sections:
+            self.sec_idx.append(self.section_code(sec_id))
+        self.sec_ptr.append(len(self.sec_idx))
+        return len(self.course) - 1
+
+    # per-session accessors (used outside the hot loops)
+
+    def course_id(self, i):
+        return self.course_names[self.course[i]]
+
+    def session_type(self, i):
+        return SESSION_TYPES[self.kind[i]]
+
+    def section_codes(self, i):
+        return self.sec_idx[self.sec_ptr[i]:self.sec_ptr[i + 1]]
+
+    def sections(self, i):
+        names = self.section_names
+        return [names[s] for s in self.section_codes(i)]
+
+    def variable_name(self, i):
+        # lectures are named after the group, labs after their only section
+        kind = self.kind[i]
+        if kind == LECTURE:
+            owner = self.group_names[self.group[i]]
+        else:
+            owner = self.section_names[self.sec_idx[self.sec_ptr[i]]]
+        return f"{owner}_{self.course_names[self.course[i]]}_{VARIABLE_SUFFIX[kind]}"
@@ -1,10 +1,40 @@
 import os
+import time
+import random
 import pandas as pd
 from Backend.data_loader import load_data, build_sessions
-from Backend.csp_model import solve_csp
+from Backend.csp_model import prepare_instance, assign_sessions, build_timetable, report_result
+from Backend.anytime import solve_anytime
+from Backend.two_phase import solve_two_phase
+from Backend.precheck import analyze_capacity, report_issues, hopeless
+from Backend.timetable_store import save_run
+from Backend.explain import explain_failures, report_explanations, explain_budget
 
-def run_solver():
+SOLVER_MODES = ["greedy", "two_phase"]
+
+
+def solve_sessions(sessions, instance, mode="greedy", seed=None, time_budget=None, verbose=True, workers=None):
+    # pick a solver - returns (solution, failed, group_days_used)
+    # time_budget: seconds for anytime mode, improving on a first pass of `mode`
+    if mode not in SOLVER_MODES:
+        raise ValueError(f"Unknown solver mode: {mode} (use one of {', '.join(SOLVER_MODES)})")
+    
+    if time_budget:
+        best, _ = solve_anytime(sessions, instance, time_budget, seed=seed, verbose=verbose,
+                                mode=mode, workers=workers)
+        return best
+    
+    rng = random.Random(seed)
+    if mode == "two_phase":
+        return solve_two_phase(sessions, instance, rng, workers=workers, verbose=verbose)
+    return assign_sessions(sessions, instance, rng, verbose=verbose)
+
+
+def run_solver(precheck=True, time_budget=None, seed=None, mode="greedy", max_per_day=None, max_per_week=None, engine=None):
     # main function that runs everything
+    # time_budget: seconds for anytime mode on top of `mode`, None for a single pass
+    # max_per_day / max_per_week: default teaching caps per instructor
+    # engine: CSV reader, None (pandas), "pyarrow" or "auto"
     
     print("=" * 60)
     print(" AUTOMATED TIMETABLE GENERATOR")
@@ -12,15 +42,43 @@ def run_solver():
     
     # load CSV files
     print("\n Loading CSV data...")
-    data = load_data()
+    data = load_data(engine=engine)
     
     # build session list
     print("\n Building sessions...")
     sessions = build_sessions(data)
     
+    instance = prepare_instance(data, max_per_day, max_per_week)
+    
+    # count resources first - shortfalls are reported and the solver still
+    # places what it can, only an input with no place for anything stops here
+    if precheck:
+        print("\n Checking capacity...")
+        issues = analyze_capacity(sessions, instance)
+        report_issues(issues)
+        if hopeless(issues):
+            print(" Nothing can be scheduled with these rooms and timeslots - fix the input and try again")
+            return pd.DataFrame()
+    
     # run the solver
-    print("\n Solving CSP...")
-    timetable_df = solve_csp(sessions, data)
+    if time_budget:
+        print(f"\n Solving CSP ({mode} + anytime, {time_budget:g}s budget)...")
+        label = f"{mode} + anytime {time_budget:g}s"
+    elif mode == "greedy":
+        print("\n Solving CSP...")
+        label = "run_solver"
+    else:
+        print(f"\n Solving CSP ({mode})...")
+        label = mode
+    
+    start = time.perf_counter()
+    solution, failed, group_days_used = solve_sessions(sessions, instance, mode, seed, time_budget)
+    solve_seconds = time.perf_counter() - start
+    report_result(len(sessions), len(solution), failed, group_days_used)
+    if failed:
+        report_explanations(explain_failures(sessions, instance, solution, failed,
+                                             time_budget=explain_budget(solve_seconds)))
+    timetable_df = build_timetable(sessions, solution, instance)
     
     if timetable_df.empty:
         print(" Failed to generate timetable")
@@ -33,6 +91,10 @@ def run_solver():
     
     timetable_df.to_csv(output_path, index=False)
     print(f"\n✅ Timetable saved to: {output_path}")
+    
+    # keep every run in the timetable store so the viewer can compare them
+    run_id = save_run(timetable_df, label=label)
+    print(f"🗄️ Stored as run {run_id}")
     print(f"📊 Generated {len(timetable_df)} scheduled sessions")
     
     return timetable_df
\ No newline at end of file
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from Backend.session_store import LECTURE, LAB
+
+# equivalence classes of interchangeable rooms and sessions
+#
+# rooms: same type and capacity (R101, R102, ... are all Lecture/80), so a
+#   solver only has to ask "is any room of this class free?" and try one
+#   representative instead of every room
+# sessions: same kind, length, course and group, same number of students, and their
+#   sections take the same courses - e.g. the labs of sibling sections. Orders
+#   that only swap two of these around are the same search, so the solvers
+#   keep class members in one canonical order
+
+
+def room_classes(instance):
+    # kind -> list of classes, every class a list of RoomIDs (input order kept)
+    capacity = instance.get("room_capacity", {})
+    classes = {}
+    for kind, rooms in ((LECTURE, instance["lecture_rooms"]), (LAB, instance["lab_rooms"])):
+        by_key = {}
+        for room in rooms:
+            by_key.setdefault(capacity.get(room), []).append(room)
+        classes[kind] = list(by_key.values())
+    return classes
+
+
+def session_classes(sessions, instance):
+    # class id per session index, sessions in the same class are interchangeable
+    section_sizes = instance.get("section_sizes", {})
+
+    # what every section takes, so siblings with different programmes don't match
+    takes = defaultdict(set)
+    for i in sessions:
+        for s in sessions.section_codes(i):
+            takes[s].add((sessions.course[i], sessions.kind[i]))
+    signature = {s: frozenset(courses) for s, courses in takes.items()}
+
+    class_ids = {}
+    session_class = []
+    for i in sessions:
+        codes = sessions.section_codes(i)
+        key = (
+            sessions.kind[i],
+            sessions.duration[i],
+            sessions.course[i],
+            sessions.group[i],
+            sum(section_sizes.get(sessions.section_names[s], 0) for s in codes),
+            frozenset(signature[s] for s in codes),
+        )
+        session_class.append(class_ids.setdefault(key, len(class_ids)))
+    return session_class
+
+
+def canonical_order(order, session_class):
+    # keep the class pattern of `order` but put the members of every class back
+    # in index order, so orders that only permute within a class collapse to one
+    members = defaultdict(list)
+    for i in order:
+        members[session_class[i]].append(i)
+    for group in members.values():
+        group.sort(reverse=True)
+    return [members[session_class[i]].pop() for i in order]
+
+
+def report_symmetry(sessions, instance):
+    rooms = room_classes(instance)
+    session_class = session_classes(sessions, instance)
+    n_rooms = sum(len(c) for classes in rooms.values() for c in classes)
+    n_room_classes = sum(len(classes) for classes in rooms.values())
+    print(f"🔁 Symmetry: {n_rooms} rooms in {n_room_classes} classes, "
+          f"{len(sessions)} sessions in {len(set(session_class))} classes")
@@ -0,0 +1,119 @@
+import sys
+import argparse
+import pandas as pd
+from Backend.timetable_store import query_run
+
+# what changed between two timetables
+# entries are matched on (SectionID, CourseID, SessionType); a course that
+# meets more than once a week is paired occurrence by occurrence, identical
+# entries first. Every pair that differs is one change:
+#   moved       - different timeslot (room / instructor may have changed too)
+#   reassigned  - same timeslot, different instructor and/or room
+#   added       - only in the new timetable
+#   removed     - only in the old one
+
+KEY = ["SectionID", "CourseID", "SessionType"]
+VALUES = ["Instructor", "Room", "TimeSlot"]
+CHANGE_TYPES = ["moved", "reassigned", "added", "removed"]
+
+CHANGE_COLUMNS = ["Change"] + KEY + [f"{side}{col}" for col in VALUES for side in ("Old", "New")]
+
+
+def with_occurrence(df, cols):
+    # number repeated rows so merges pair them one to one
+    df = df[KEY + VALUES].astype(str).reset_index(drop=True)
+    df["_n"] = df.groupby(cols, sort=False).cumcount()
+    return df
+
+
+def diff_timetables(old_df, new_df):
+    # change set as a DataFrame with CHANGE_COLUMNS, unchanged entries left out
+    old = with_occurrence(old_df, KEY + VALUES)
+    new = with_occurrence(new_df, KEY + VALUES)
+
+    # identical entries drop out first
+    exact = old.merge(new, on=KEY + VALUES + ["_n"], how="outer", indicator=True)
+    old_rest = exact[exact["_merge"] == "left_only"]
+    new_rest = exact[exact["_merge"] == "right_only"]
+
+    # then pair what's left on the key alone
+    old_rest = with_occurrence(old_rest, KEY)
+    new_rest = with_occurrence(new_rest, KEY)
+    paired = old_rest.merge(new_rest, on=KEY + ["_n"], how="outer", suffixes=("_old", "_new"), indicator=True)
+
+    changes = pd.DataFrame({
+        "Change": "moved",
+        **{col: paired[col] for col in KEY},
+        **{f"{side}{col}": paired[f"{col}_{side.lower()}"] for col in VALUES for side in ("Old", "New")},
+    }, columns=CHANGE_COLUMNS)
+
+    both = paired["_merge"] == "both"
+    same_slot = paired["TimeSlot_old"] == paired["TimeSlot_new"]
+    changes.loc[both & same_slot, "Change"] = "reassigned"
+    changes.loc[paired["_merge"] == "right_only", "Change"] = "added"
+    changes.loc[paired["_merge"] == "left_only", "Change"] = "removed"
+
+    order = {change: n for n, change in enumerate(CHANGE_TYPES)}
+    changes = changes.sort_values(by=["Change", "SectionID", "CourseID", "SessionType"],
+                                  key=lambda col: col.map(order) if col.name == "Change" else col)
+    return changes.reset_index(drop=True)
+
+
+def diff_runs(old_run, new_run, db_path=None, **filters):
+    # compare two stored runs (or the same slice of them)
+    return diff_timetables(query_run(old_run, db_path=db_path, **filters),
+                           query_run(new_run, db_path=db_path, **filters))
+
+
+def summarize_changes(changes):
+    counts = changes["Change"].value_counts()
+    return {change: int(counts.get(change, 0)) for change in CHANGE_TYPES}
+
+
+def changed_cells(changes):
+    # (SectionID, TimeSlot) of every grid cell that looks different now:
+    # where entries left and where they arrived
+    cells = set()
+    for sec_id, old_ts, new_ts in changes[["SectionID", "OldTimeSlot", "NewTimeSlot"]].itertuples(index=False, name=None):
+        if pd.notna(old_ts):
+            cells.add((sec_id, old_ts))
+        if pd.notna(new_ts):
+            cells.add((sec_id, new_ts))
+    return cells
+
+
+def describe(row):
+    def where(side):
+        return f"{row[side + 'TimeSlot']} {row[side + 'Room']} ({row[side + 'Instructor']})"
+
+    head = f"{row['SectionID']} {row['CourseID']} {row['SessionType']}"
+    if row["Change"] == "added":
+        return f"+ {head}: {where('New')}"
+    if row["Change"] == "removed":
+        return f"- {head}: {where('Old')}"
+    return f"~ {head}: {where('Old')} -> {where('New')}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two stored timetable runs")
+    parser.add_argument("old_run", type=int)
+    parser.add_argument("new_run", type=int)
+    parser.add_argument("--db", default=None, help="database file (default Output/timetables.db)")
+    parser.add_argument("--section", action="append", default=None, help="only these sections")
+    parser.add_argument("--csv", action="store_true", help="print the change set as CSV")
+    args = parser.parse_args(argv)
+
+    changes = diff_runs(args.old_run, args.new_run, args.db, section=args.section)
+    if args.csv:
+        changes.to_csv(sys.stdout, index=False)
+        return
+
+    summary = summarize_changes(changes)
+    print(f"🔀 Run {args.old_run} -> {args.new_run}: "
+          + ", ".join(f"{count} {change}" for change, count in summary.items()))
+    for _, row in changes.iterrows():
+        print(f"   {describe(row)}")
+
+
+if __name__ == "__main__":
+    main()
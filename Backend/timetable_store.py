@@ -0,0 +1,205 @@
+import os
+import sys
+import sqlite3
+import argparse
+from datetime import datetime
+import pandas as pd
+
+# persistent store for generated timetables, one run per solve
+# the viewer and the CLI only pull the slice they show instead of the whole CSV
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Output", "timetables.db")
+
+COLUMNS = ["SectionID", "CourseID", "SessionType", "Instructor", "Room",
+           "TimeSlot", "Day", "StartTime", "EndTime"]
+# stored when the timetable has them (merged department runs), NULL otherwise
+OPTIONAL_COLUMNS = ["Department"]
+
+# filter argument -> column, every one of these has an index
+FILTERS = {
+    "section": "SectionID",
+    "instructor": "Instructor",
+    "room": "Room",
+    "day": "Day",
+    "timeslot": "TimeSlot",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    label TEXT,
+    entries INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    SectionID TEXT NOT NULL,
+    CourseID TEXT NOT NULL,
+    SessionType TEXT NOT NULL,
+    Instructor TEXT,
+    Room TEXT,
+    TimeSlot TEXT NOT NULL,
+    Day TEXT,
+    StartTime TEXT,
+    EndTime TEXT,
+    Department TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_section ON entries(run_id, SectionID);
+CREATE INDEX IF NOT EXISTS idx_entries_instructor ON entries(run_id, Instructor);
+CREATE INDEX IF NOT EXISTS idx_entries_room ON entries(run_id, Room);
+CREATE INDEX IF NOT EXISTS idx_entries_day ON entries(run_id, Day);
+CREATE INDEX IF NOT EXISTS idx_entries_timeslot ON entries(run_id, TimeSlot);
+"""
+
+
+def connect(db_path=None):
+    db_path = db_path or DEFAULT_DB
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    # databases from before the optional columns get them added
+    have = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+    for col in OPTIONAL_COLUMNS:
+        if col not in have:
+            conn.execute(f"ALTER TABLE entries ADD COLUMN {col} TEXT")
+    return conn
+
+
+def save_run(timetable_df, label=None, db_path=None):
+    # store a whole timetable as a new run and return its id
+    columns = COLUMNS + [col for col in OPTIONAL_COLUMNS if col in timetable_df.columns]
+    # as text, with missing values left NULL rather than stored as "nan"
+    df = timetable_df[columns]
+    rows = df.astype(str).where(df.notna(), None).itertuples(index=False, name=None)
+
+    with connect(db_path) as conn:
+        cur = conn.execute(
+            "INSERT INTO runs (created_at, label, entries) VALUES (?, ?, ?)",
+            (datetime.now().isoformat(timespec="seconds"), label, len(timetable_df))
+        )
+        run_id = cur.lastrowid
+        conn.executemany(
+            f"INSERT INTO entries (run_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)})",
+            ((run_id,) + row for row in rows)
+        )
+    conn.close()
+    return run_id
+
+
+def import_csv(csv_path, label=None, db_path=None):
+    # bring an existing generated_timetable.csv into the store
+    df = pd.read_csv(csv_path)
+    return save_run(df, label or os.path.basename(csv_path), db_path)
+
+
+def list_runs(db_path=None):
+    conn = connect(db_path)
+    try:
+        return pd.read_sql_query(
+            "SELECT run_id, created_at, label, entries FROM runs ORDER BY run_id DESC", conn
+        )
+    finally:
+        conn.close()
+
+
+def delete_run(run_id, db_path=None):
+    with connect(db_path) as conn:
+        conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+    conn.close()
+
+
+def query_run(run_id=None, section_contains=None, db_path=None, **filters):
+    # fetch the entries of one run, optionally narrowed down
+    # filters: section / instructor / room / day / timeslot (a value or a list)
+    # section_contains: text(s) SectionID must contain, all of them, taken
+    # literally (instr rather than LIKE, so "_" and "%" aren't wildcards)
+    conn = connect(db_path)
+    try:
+        if run_id is None:
+            run_id = conn.execute("SELECT MAX(run_id) FROM runs").fetchone()[0]
+            if run_id is None:
+                return pd.DataFrame(columns=COLUMNS)
+
+        where = ["run_id = ?"]
+        params = [run_id]
+
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if key not in FILTERS:
+                raise ValueError(f"Unknown filter: {key}")
+            values = [value] if isinstance(value, str) else list(value)
+            where.append(f"{FILTERS[key]} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        if section_contains:
+            parts = [section_contains] if isinstance(section_contains, str) else list(section_contains)
+            for part in parts:
+                where.append("instr(SectionID, ?) > 0")
+                params.append(part)
+
+        sql = f"SELECT {', '.join(COLUMNS + OPTIONAL_COLUMNS)} FROM entries WHERE {' AND '.join(where)} ORDER BY rowid"
+        df = pd.read_sql_query(sql, conn, params=params)
+        # only keep optional columns the run actually has
+        return df.drop(columns=[col for col in OPTIONAL_COLUMNS if df[col].isna().all()])
+    finally:
+        conn.close()
+
+
+def run_stats(run_id, db_path=None):
+    # the counts the viewer shows on its stat cards
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT SectionID), COUNT(DISTINCT CourseID), "
+            "COUNT(DISTINCT Instructor), COUNT(DISTINCT Room) FROM entries WHERE run_id = ?",
+            (run_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(["sessions", "sections", "courses", "instructors", "rooms"], row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query stored timetable runs")
+    parser.add_argument("--db", default=None, help="database file (default Output/timetables.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("runs", help="list stored runs")
+
+    show = sub.add_parser("show", help="print (part of) a run")
+    show.add_argument("--run", type=int, default=None, help="run id (default latest)")
+    for key in FILTERS:
+        show.add_argument(f"--{key}", action="append", default=None)
+    show.add_argument("--csv", action="store_true", help="print as CSV")
+
+    imp = sub.add_parser("import", help="store an existing timetable CSV as a new run")
+    imp.add_argument("csv_path")
+    imp.add_argument("--label", default=None)
+
+    rm = sub.add_parser("delete", help="delete a run")
+    rm.add_argument("run_id", type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "runs":
+        runs = list_runs(args.db)
+        print("No runs stored yet" if runs.empty else runs.to_string(index=False))
+    elif args.command == "show":
+        filters = {key: getattr(args, key) for key in FILTERS}
+        df = query_run(args.run, db_path=args.db, **filters)
+        if args.csv:
+            df.to_csv(sys.stdout, index=False)
+        else:
+            print(df.to_string(index=False))
+    elif args.command == "import":
+        run_id = import_csv(args.csv_path, args.label, args.db)
+        print(f"✅ Stored as run {run_id}")
+    elif args.command == "delete":
+        delete_run(args.run_id, args.db)
+        print(f"🗑️ Deleted run {args.run_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import os
+import random
+from bisect import insort
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from Backend.session_store import LECTURE, LAB
+from Backend.csp_model import session_order, prioritized_timeslots
+from Backend.instructor_queue import InstructorQueue
+
+# two-phase solve
+#   phase 1: pick instructor + timeslot for every session, treating the rooms of
+#            each type as a per-slot budget instead of picking one
+#   phase 2: for every timeslot, give rooms to the sessions in it with a
+#            bipartite matching (Hopcroft-Karp), in a process pool on request
+#
+# phase 1 keeps every slot "matchable": rooms of a type only differ in capacity,
+# so a slot has a room assignment iff the k-th biggest session fits in the k-th
+# biggest room for every k (Hall's condition for nested room sets). That means
+# phase 2 always finds a room for every session phase 1 placed.
+
+INF = float("inf")
+POOL_MIN_SESSIONS = 20000   # below this, matching in-process beats starting a pool
+
+
+def session_size(sessions, i, section_sizes):
+    return sum(section_sizes.get(sec, 0) for sec in sessions.sections(i))
+
+
+def fits(demands, size, capacities):
+    # would the slot still be matchable with one more session of this size?
+    # demands and capacities are both sorted biggest first
+    if len(demands) >= len(capacities):
+        return False
+    merged = list(demands)
+    k = 0
+    while k < len(merged) and merged[k] >= size:
+        k += 1
+    merged.insert(k, size)
+    return all(need <= cap for need, cap in zip(merged, capacities))
+
+
+def hopcroft_karp(adjacency, n_right):
+    # maximum matching, adjacency[u] = list of right vertices for left vertex u
+    # returns match_left (right vertex per left vertex, or -1)
+    n_left = len(adjacency)
+    match_left = [-1] * n_left
+    match_right = [-1] * n_right
+    dist = [0] * n_left
+
+    def bfs():
+        queue = deque()
+        for u in range(n_left):
+            if match_left[u] == -1:
+                dist[u] = 0
+                queue.append(u)
+            else:
+                dist[u] = INF
+        found = False
+        while queue:
+            u = queue.popleft()
+            for v in adjacency[u]:
+                w = match_right[v]
+                if w == -1:
+                    found = True
+                elif dist[w] == INF:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+        return found
+
+    def dfs(u):
+        for v in adjacency[u]:
+            w = match_right[v]
+            if w == -1 or (dist[w] == dist[u] + 1 and dfs(w)):
+                match_left[u] = v
+                match_right[v] = u
+                return True
+        dist[u] = INF
+        return False
+
+    while bfs():
+        for u in range(n_left):
+            if match_left[u] == -1:
+                dfs(u)
+
+    return match_left
+
+
+def match_slot(task):
+    # phase 2 for one timeslot: task = (timeslot, [(session, size, rooms)], capacity)
+    # rooms are listed smallest first, so tight rooms are tried before big ones
+    timeslot, items, room_capacity = task
+    room_ids = {}
+    adjacency = []
+    for _, size, rooms in items:
+        edges = []
+        for room in rooms:
+            if room_capacity.get(room, INF) >= size:
+                edges.append(room_ids.setdefault(room, len(room_ids)))
+        adjacency.append(edges)
+
+    match = hopcroft_karp(adjacency, len(room_ids))
+    rooms_by_id = {v: room for room, v in room_ids.items()}
+    return timeslot, {items[u][0]: rooms_by_id[v] for u, v in enumerate(match) if v != -1}
+
+
+def claim_room(rooms, size, block_slots, demands_at, capacities_at, room_capacity, free):
+    # a multi-slot session needs the same room for its whole block, so it gets
+    # one here: the smallest room that is free for the block, fits the
+    # session, and leaves every slot of the block matchable without it
+    for room in rooms:
+        cap = room_capacity.get(room, INF)
+        if cap < size or not free(room):
+            continue
+        ok = True
+        for timeslot in block_slots:
+            rest = list(capacities_at(timeslot))
+            rest.remove(cap)
+            demands = [-d for d in demands_at(timeslot)]
+            if len(demands) > len(rest) or not all(need <= c for need, c in zip(demands, rest)):
+                ok = False
+                break
+        if ok:
+            return room
+    return None
+
+
+def assign_timeslots(sessions, instance, rng, order=None):
+    # phase 1: instructors and timeslots, rooms only counted per slot and type
+    # (except for multi-slot sessions, which claim one room for their block)
+    slots = instance["slots"]
+    position = slots.position
+    full_mask = slots.full
+    excluded = instance.get("slot_blocked", 0)   # timeslots taken out of the instance
+    timeslot_to_day = instance["timeslot_to_day"]
+    instructor_masks = instance["instructor_masks"]
+    section_sizes = instance["section_sizes"]
+    room_capacity = instance["room_capacity"]
+
+    room_lists = {LECTURE: instance["lecture_rooms"], LAB: instance["lab_rooms"]}
+    room_lists_by_size = {kind: sorted(rooms, key=lambda r: room_capacity.get(r, INF)) for kind, rooms in room_lists.items()}
+    capacities = {
+        kind: sorted((room_capacity.get(r, INF) for r in rooms), reverse=True)
+        for kind, rooms in room_lists.items()
+    }
+
+    # capacity list per (kind, timeslot), without rooms blocked there and
+    # without rooms a multi-slot session has already claimed for its block
+    # (every slot of the week, excluded ones too - they're masked out above)
+    room_blocked = instance.get("room_blocked", {})
+    slot_capacities = {}
+    for kind, rooms in room_lists.items():
+        for timeslot in slots.ids:
+            bit = 1 << position[timeslot]
+            if any(room_blocked.get(r, 0) & bit for r in rooms):
+                slot_capacities[(kind, timeslot)] = sorted(
+                    (room_capacity.get(r, INF) for r in rooms if not room_blocked.get(r, 0) & bit), reverse=True
+                )
+            else:
+                slot_capacities[(kind, timeslot)] = list(capacities[kind])
+    claimed = defaultdict(int)         # room -> slots held by multi-slot sessions
+    pinned = {}                        # session -> the room its block got
+
+    instructor_schedule = defaultdict(int)
+    section_schedule = [0] * len(sessions.section_names)
+    group_days_used = defaultdict(set)
+    slot_demands = defaultdict(list)   # (kind, timeslot) -> negated sizes, sorted
+
+    queue = InstructorQueue(sessions, instance, rng)
+
+    placement = {}
+    failed = []
+
+    for i in order or session_order(sessions):
+        kind = sessions.kind[i]
+        course_id = sessions.course_id(i)
+        sections = sessions.section_codes(i)
+        group_code = sessions.group[i]
+        size = session_size(sessions, i, section_sizes)
+        duration = sessions.duration[i]
+
+        valid_instructors = queue.ranked(course_id, kind)
+        if not instance["qualified_for"].get((course_id, kind)):
+            failed.append({
+                "index": i,
+                "session": sessions.variable_name(i),
+                "course": course_id,
+                "type": sessions.session_type(i),
+                "reason": "No qualified instructor"
+            })
+            continue
+
+        timeslots_prioritized = prioritized_timeslots(group_days_used[group_code], instance)
+
+        sections_busy = 0
+        for s in sections:
+            sections_busy |= section_schedule[s]
+
+        found = False
+        for instructor in valid_instructors:
+            busy = instructor_schedule[instructor] | sections_busy | queue.blocked(instructor, duration) | excluded
+            free = instructor_masks.get(instructor, full_mask) & ~busy
+            starts = slots.block_starts(free, duration)
+            if not starts:
+                continue
+
+            for timeslot in timeslots_prioritized:
+                bit = 1 << position[timeslot]
+                if not starts & bit:
+                    continue
+
+                if duration == 1:
+                    block = bit
+                    demands = slot_demands[(kind, timeslot)]
+                    if not fits([-d for d in demands], size, slot_capacities[(kind, timeslot)]):
+                        continue
+                    insort(demands, -size)
+                else:
+                    block = slots.block(position[timeslot], duration)
+                    block_slots = slots.block_slots(timeslot, duration)
+                    room = claim_room(
+                        room_lists_by_size[kind], size, block_slots,
+                        lambda ts: slot_demands[(kind, ts)],
+                        lambda ts: slot_capacities[(kind, ts)],
+                        room_capacity,
+                        lambda r: not (claimed[r] | room_blocked.get(r, 0)) & block,
+                    )
+                    if room is None:
+                        continue
+                    pinned[i] = room
+                    claimed[room] |= block
+                    for ts in block_slots:
+                        slot_capacities[(kind, ts)].remove(room_capacity.get(room, INF))
+
+                placement[i] = (instructor, timeslot)
+                queue.assigned(instructor, course_id, kind, timeslot, duration)
+                instructor_schedule[instructor] |= block
+                for s in sections:
+                    section_schedule[s] |= block
+                group_days_used[group_code].add(timeslot_to_day[timeslot])
+                found = True
+                break
+
+            if found:
+                break
+
+        if not found:
+            queue.placed(course_id, kind)
+            failed.append({
+                "index": i,
+                "session": sessions.variable_name(i),
+                "course": course_id,
+                "type": sessions.session_type(i),
+                "reason": "No valid combination found"
+            })
+
+    days_by_group = {sessions.group_names[g]: used for g, used in group_days_used.items()}
+    return placement, failed, days_by_group, pinned
+
+
+def assign_rooms(sessions, instance, placement, workers=None, pinned=None):
+    # phase 2: one matching per timeslot, in this process unless `workers` asks
+    # for a pool (or the instance is big enough for one to pay off)
+    # pinned: rooms phase 1 already gave to multi-slot sessions
+    section_sizes = instance["section_sizes"]
+    room_capacity = instance["room_capacity"]
+    room_lists = {
+        LECTURE: sorted(instance["lecture_rooms"], key=lambda r: room_capacity.get(r, INF)),
+        LAB: sorted(instance["lab_rooms"], key=lambda r: room_capacity.get(r, INF)),
+    }
+
+    # rooms blocked in a slot (or held by a block there) are left out of that
+    # slot's matching
+    pinned = pinned or {}
+    slots = instance["slots"]
+    unavailable = defaultdict(int, instance.get("room_blocked", {}))
+    for i, room in pinned.items():
+        unavailable[room] |= slots.block(slots.position[placement[i][1]], sessions.duration[i])
+
+    def rooms_at(kind, timeslot):
+        bit = 1 << slots.position[timeslot]
+        return [r for r in room_lists[kind] if not unavailable[r] & bit]
+
+    by_slot = defaultdict(list)
+    for i, (_, timeslot) in placement.items():
+        if i in pinned:
+            continue
+        rooms = rooms_at(sessions.kind[i], timeslot) if unavailable else room_lists[sessions.kind[i]]
+        by_slot[timeslot].append((i, session_size(sessions, i, section_sizes), rooms))
+
+    tasks = [(ts, items, room_capacity) for ts, items in by_slot.items()]
+    if workers is None:
+        # starting processes costs more than the matchings themselves until
+        # instances get really big, so only ask for a pool then
+        workers = (os.cpu_count() or 1) if len(placement) >= POOL_MIN_SESSIONS else 1
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(match_slot, tasks))
+    else:
+        results = [match_slot(task) for task in tasks]
+
+    rooms = dict(pinned)
+    for _, matched in results:
+        rooms.update(matched)
+    return rooms
+
+
+def solve_two_phase(sessions, instance, rng=None, workers=None, verbose=True, order=None):
+    # same return shape as assign_sessions: (solution, failed, group_days_used)
+    rng = rng or random.Random()
+
+    placement, failed, group_days_used, pinned = assign_timeslots(sessions, instance, rng, order)
+    if verbose:
+        print(f"   Phase 1: {len(placement)}/{len(sessions)} sessions got an instructor and timeslot")
+
+    rooms = assign_rooms(sessions, instance, placement, workers, pinned)
+    if verbose:
+        print(f"   Phase 2: matched rooms in {len({ts for _, ts in placement.values()})} timeslots")
+
+    solution = {}
+    for i, (instructor, timeslot) in placement.items():
+        room = rooms.get(i)
+        if room is None:
+            # can't happen while phase 1 keeps every slot matchable, but be safe
+            failed.append({
+                "index": i,
+                "session": sessions.variable_name(i),
+                "course": sessions.course_id(i),
+                "type": sessions.session_type(i),
+                "reason": "No room left in the matching"
+            })
+            continue
+        solution[i] = (instructor, room, timeslot)
+
+    return solution, failed, group_days_used
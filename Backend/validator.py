@@ -0,0 +1,120 @@
+from collections import defaultdict
+from Backend.session_store import LECTURE, LAB
+
+# check a finished timetable against the hard constraints
+# returns a list of {"type": ..., "detail": ...} dicts, empty when it's clean
+
+KINDS = {"Lecture": LECTURE, "Lab": LAB}
+
+
+def find_conflicts(timetable_df, instance):
+    conflicts = []
+    if timetable_df is None or len(timetable_df) == 0:
+        return conflicts
+
+    rooms = {LECTURE: set(instance["lecture_rooms"]), LAB: set(instance["lab_rooms"])}
+    qualified_for = instance["qualified_for"]
+    known_slots = set(instance["slots"].ids)
+    position = instance["slots"].position
+    room_blocked = instance.get("room_blocked", {})
+    slot_blocked = instance.get("slot_blocked", 0)
+
+    # lectures produce one row per section, so dedupe on the session itself
+    instructor_at = defaultdict(set)
+    room_at = defaultdict(set)
+    section_at = defaultdict(list)
+    block_rows = defaultdict(list)
+
+    cols = ["SectionID", "CourseID", "SessionType", "Instructor", "Room", "TimeSlot"]
+    for sec_id, course_id, session_type, instructor, room, ts in timetable_df[cols].itertuples(index=False, name=None):
+        ts = str(ts)
+        if ts not in known_slots:
+            conflicts.append({"type": "unknown timeslot", "detail": f"{sec_id} {course_id} is in unknown slot {ts}"})
+            continue
+
+        if slot_blocked >> position[ts] & 1:
+            conflicts.append({"type": "excluded timeslot", "detail": f"{sec_id} {course_id} is in excluded slot {ts}"})
+
+        session_key = (course_id, session_type, instructor, room, ts)
+        instructor_at[(instructor, ts)].add(session_key)
+        room_at[(room, ts)].add(session_key)
+        section_at[(sec_id, ts)].append(course_id)
+        block_rows[(sec_id, course_id, session_type)].append((ts, room, instructor))
+
+        kind = KINDS.get(session_type)
+        if kind is None:
+            conflicts.append({"type": "unknown session type", "detail": f"{sec_id} {course_id}: {session_type}"})
+            continue
+        if room not in rooms[kind]:
+            conflicts.append({"type": "room type", "detail": f"{session_type} {course_id} is in {room}"})
+        if room_blocked.get(room, 0) >> position[ts] & 1:
+            conflicts.append({"type": "room lease", "detail": f"{sec_id} {course_id} uses {room} at {ts}, which isn't available then"})
+        if instructor not in qualified_for.get((str(course_id).upper(), kind), ()):
+            conflicts.append({"type": "qualification", "detail": f"{instructor} can't teach {course_id} {session_type}"})
+
+    for (instructor, ts), sessions in instructor_at.items():
+        if len(sessions) > 1:
+            courses = ", ".join(sorted(s[0] for s in sessions))
+            conflicts.append({"type": "instructor clash", "detail": f"{instructor} has {courses} at {ts}"})
+
+    for (room, ts), sessions in room_at.items():
+        if len(sessions) > 1:
+            courses = ", ".join(sorted(s[0] for s in sessions))
+            conflicts.append({"type": "room clash", "detail": f"{room} has {courses} at {ts}"})
+
+    # teaching caps, counted per session (not per section row)
+    caps = instance.get("instructor_caps", {})
+    timeslot_to_day = instance["timeslot_to_day"]
+    week_load = defaultdict(int)
+    day_load = defaultdict(int)
+    for (instructor, ts), sessions in instructor_at.items():
+        week_load[instructor] += len(sessions)
+        day_load[(instructor, timeslot_to_day.get(ts))] += len(sessions)
+    for (instructor, day), load in day_load.items():
+        day_cap = caps.get(instructor, (None, None))[0]
+        if day_cap is not None and load > day_cap:
+            conflicts.append({"type": "daily cap", "detail": f"{instructor} teaches {load} sessions on {day} (cap {day_cap})"})
+    for instructor, load in week_load.items():
+        week_cap = caps.get(instructor, (None, None))[1]
+        if week_cap is not None and load > week_cap:
+            conflicts.append({"type": "weekly cap", "detail": f"{instructor} teaches {load} sessions a week (cap {week_cap})"})
+
+    for (sec_id, ts), courses in section_at.items():
+        if len(courses) > 1:
+            conflicts.append({"type": "section clash", "detail": f"{sec_id} has {', '.join(sorted(courses))} at {ts}"})
+
+    # multi-slot sessions: back to back on one day, in one room, with one instructor
+    durations = instance.get("session_durations", {})
+    slots = instance["slots"]
+    for (sec_id, course_id, session_type), rows in block_rows.items():
+        duration = durations.get((str(course_id).upper(), KINDS.get(session_type)), 1)
+        if duration == 1:
+            continue
+        if len(rows) != duration:
+            conflicts.append({"type": "block length", "detail": f"{sec_id} {course_id} {session_type} has "
+                                                                f"{len(rows)} slots instead of {duration}"})
+            continue
+        mask = slots.mask_of(ts for ts, _, _ in rows)
+        if not any(slots.block(position[ts], duration) == mask for ts, _, _ in rows):
+            conflicts.append({"type": "block", "detail": f"{sec_id} {course_id} {session_type} isn't in "
+                                                         f"{duration} consecutive slots on one day"})
+        if len({(room, instructor) for _, room, instructor in rows}) > 1:
+            conflicts.append({"type": "block", "detail": f"{sec_id} {course_id} {session_type} changes room "
+                                                         f"or instructor within its block"})
+
+    return conflicts
+
+
+def find_cross_clashes(merged_df):
+    # rooms and instructors booked by two departments at once in a merged
+    # timetable (it needs a Department column)
+    conflicts = []
+    for column, label in (("Room", "room"), ("Instructor", "instructor")):
+        departments_at = defaultdict(set)
+        for department, value, ts in merged_df[["Department", column, "TimeSlot"]].itertuples(index=False, name=None):
+            departments_at[(value, ts)].add(department)
+        for (value, ts), departments in departments_at.items():
+            if len(departments) > 1:
+                conflicts.append({"type": f"shared {label} clash",
+                                  "detail": f"{value} is booked by {', '.join(sorted(departments))} at {ts}"})
+    return conflicts
@@ -11,8 +11,14 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
 sys.path.insert(0, PROJECT_ROOT)
 
-from Backend.data_loader import build_sessions
-from Backend.solver import solve_csp
+from Backend.data_loader import build_sessions, load_sources, check_data, DataValidationError
+from Backend.solver import solve_sessions, SOLVER_MODES
+from Backend.csp_model import prepare_instance, build_timetable
+from Backend.precheck import analyze_capacity, hopeless
+from Backend.timetable_store import save_run, import_csv, list_runs, query_run, run_stats
+from Backend.bulk_export import export_bytes
+from Backend.explain import explain_failures, explain_budget
+from Backend.timetable_diff import diff_runs, diff_timetables, changed_cells, summarize_changes, CHANGE_TYPES
 
 st.set_page_config(
     page_title="CSIT Timetable System",
@@ -170,6 +176,11 @@ st.markdown("""
     background: #fafafa;
 }
 
+.changed-cell {
+    outline: 3px solid #f59e0b;
+    outline-offset: -3px;
+}
+
 .stButton>button {
     background: #4f46e5;
     color: white;
@@ -260,31 +271,57 @@ def parse_time_label(time_label):
     except:
         return datetime.min
 
-def generate_timetable_from_files(courses_file, instructors_file, rooms_file, sections_file, timeslots_file):
+def generate_timetable_from_files(courses_file, instructors_file, rooms_file, sections_file, timeslots_file, time_budget=0, mode="greedy", precheck=True):
     try:
         with st.spinner("Loading data..."):
-            data = {
-                "courses": pd.read_csv(courses_file),
-                "instructors": pd.read_csv(instructors_file),
-                "rooms": pd.read_csv(rooms_file),
-                "sections": pd.read_csv(sections_file),
-                "timeslots": pd.read_csv(timeslots_file)
-            }
+            data = load_sources({
+                "courses": courses_file,
+                "instructors": instructors_file,
+                "rooms": rooms_file,
+                "sections": sections_file,
+                "timeslots": timeslots_file
+            }, engine="auto", verbose=False)
+            check_data(data, verbose=False)
         
         with st.spinner("Building sessions..."):
             sessions = build_sessions(data)
         
-        with st.spinner("Running solver..."):
-            timetable_df = solve_csp(sessions, data)
+        instance = prepare_instance(data)
+        issues = []
+        if precheck:
+            with st.spinner("Checking capacity..."):
+                issues = analyze_capacity(sessions, instance)
+        
+        # shortfalls are shown next to the result, only a hopeless input stops here
+        st.session_state['precheck_issues'] = issues
+        if hopeless(issues):
+            details = "; ".join(f"{i['subject']}: {i['detail']}" for i in issues[:5])
+            return None, f"Nothing can be scheduled - {details}", None
+        
+        message = f"Improving the timetable for {time_budget:g} seconds..." if time_budget else "Running solver..."
+        with st.spinner(message):
+            start = time.perf_counter()
+            solution, failed, _ = solve_sessions(sessions, instance, mode, time_budget=time_budget or None)
+            solve_seconds = time.perf_counter() - start
+            timetable_df = build_timetable(sessions, solution, instance)
+        
+        # say why anything is missing, so the next upload can fix it
+        st.session_state['explanations'] = explain_failures(sessions, instance, solution, failed,
+                                                            time_budget=explain_budget(solve_seconds))
         
         if timetable_df.empty:
             return None, "Failed to generate timetable", None
         
         os.makedirs(OUTPUT_DIR, exist_ok=True)
         timetable_df.to_csv(OUTPUT_FILE, index=False)
+        label = f"uploaded files, {mode} + anytime {time_budget:g}s" if time_budget else f"uploaded files, {mode}"
+        run_id = save_run(timetable_df, label=label)
         
-        return timetable_df, "Success", data
+        return run_id, "Success", data
     
+    except DataValidationError as e:
+        more = f" (and {len(e.problems) - 5} more)" if len(e.problems) > 5 else ""
+        return None, "Invalid CSV files - " + "; ".join(e.problems[:5]) + more, None
     except Exception as e:
         return None, str(e), None
 
@@ -313,58 +350,97 @@ with st.expander("📤 Upload CSV Files", expanded=True):
     
     all_files_uploaded = all([courses_file, instructors_file, rooms_file, sections_file, timeslots_file])
     
+    col_mode, col_budget = st.columns(2)
+    with col_mode:
+        solver_mode = st.selectbox("Solver mode", SOLVER_MODES)
+    with col_budget:
+        time_budget = st.number_input(
+            "Time budget (seconds, 0 = single pass)",
+            min_value=0.0, max_value=3600.0, value=0.0, step=5.0
+        )
+    precheck = st.checkbox("Check capacity before solving", value=True)
+    
     if all_files_uploaded:
         if st.button("Generate Timetable from Uploaded Files"):
-            timetable_df, status, data = generate_timetable_from_files(
-                courses_file, instructors_file, rooms_file, sections_file, timeslots_file
+            run_id, status, data = generate_timetable_from_files(
+                courses_file, instructors_file, rooms_file, sections_file, timeslots_file, time_budget, solver_mode,
+                precheck
             )
             
-            if timetable_df is not None:
-                st.success(f"Generated {len(timetable_df)} sessions successfully")
-                st.session_state['generated_df'] = timetable_df
+            if run_id is not None:
+                st.success(f"Generated run {run_id} successfully")
+                st.session_state['run_id'] = run_id
                 st.session_state['data'] = data
                 st.rerun()
             else:
                 st.error(f"Generation failed: {status}")
     else:
         st.info("Please upload all 5 CSV files to generate a timetable")
+    
+    issues = st.session_state.get('precheck_issues')
+    if issues:
+        st.warning(f"The pre-check found {len(issues)} shortfalls in the last upload")
+        st.markdown("\n".join(f"- {i['subject']}: {i['detail']} (short by {i['need'] - i['have']})"
+                               for i in issues[:10])
+                    + (f"\n- ... and {len(issues) - 10} more" if len(issues) > 10 else ""))
+    
+    explanations = st.session_state.get('explanations')
+    if explanations:
+        st.warning(f"{len(explanations)} sessions couldn't be placed in the last run")
+        for e in explanations:
+            st.markdown(f"**{e['session']}** ({e['course']} - {e['type']})")
+            st.markdown("\n".join(f"- because {reason}" for reason in e['core'][:6])
+                        + (f"\n- ... and {len(e['core']) - 6} more" if len(e['core']) > 6 else ""))
+            if e['relaxation']:
+                st.markdown(f"Fix: {'; '.join(e['relaxation'])}")
 
 st.markdown("---")
 
-# Check if we have generated data or existing file
-df = None
+# Pick a stored run - old generated_timetable.csv files get imported once
 courses_df = None
-instructors_df = None
 timeslots_df = None
-rooms_df = None
 
-if 'generated_df' in st.session_state and 'data' in st.session_state:
-    df = st.session_state['generated_df']
+try:
+    runs_df = list_runs()
+    if runs_df.empty and os.path.exists(OUTPUT_FILE):
+        import_csv(OUTPUT_FILE)
+        runs_df = list_runs()
+except Exception as e:
+    st.warning(f"Could not open the timetable store: {e}")
+    runs_df = pd.DataFrame()
+
+if runs_df.empty:
+    st.info("No timetable generated yet. Upload CSV files above to get started.")
+    st.stop()
+
+run_labels = {
+    int(row.run_id): f"Run {row.run_id} - {row.created_at} ({row.label or 'unnamed'}, {row.entries} entries)"
+    for row in runs_df.itertuples()
+}
+run_ids = list(run_labels)
+default_run = st.session_state.get('run_id', run_ids[0])
+selected_label = st.sidebar.selectbox(
+    "Timetable run:", list(run_labels.values()),
+    index=run_ids.index(default_run) if default_run in run_ids else 0
+)
+selected_run = run_ids[list(run_labels.values()).index(selected_label)]
+
+compare_options = ["Nothing"] + [label for run_id, label in run_labels.items() if run_id != selected_run]
+compare_label = st.sidebar.selectbox("Compare with:", compare_options)
+compare_run = None if compare_label == "Nothing" else run_ids[list(run_labels.values()).index(compare_label)]
+
+if 'data' in st.session_state:
     courses_df = st.session_state['data']['courses']
-    instructors_df = st.session_state['data']['instructors']
     timeslots_df = st.session_state['data']['timeslots']
-    rooms_df = st.session_state['data']['rooms']
-elif os.path.exists(OUTPUT_FILE):
+else:
     try:
-        df = pd.read_csv(OUTPUT_FILE)
-        
-        # Try to load from CSV folder as fallback
+        # Load reference tables from CSV folder as fallback
         csv_folder = os.path.join(PROJECT_ROOT, "CSV")
         courses_df = pd.read_csv(os.path.join(csv_folder, "Courses.csv"))
-        instructors_df = pd.read_csv(os.path.join(csv_folder, "Instructors.csv"))
         timeslots_df = pd.read_csv(os.path.join(csv_folder, "TimeSlots.csv"))
-        rooms_df = pd.read_csv(os.path.join(csv_folder, "Rooms.csv"))
     except Exception as e:
-        st.warning(f"Could not load existing timetable: {e}")
-
-if df is None:
-    st.info("No timetable generated yet. Upload CSV files above to get started.")
-    st.stop()
-
-df['YearToken'] = df['SectionID'].apply(extract_year)
-df['YearLabel'] = df['YearToken'].map(YEAR_LABELS)
-df['Track'] = df['SectionID'].apply(extract_track)
-df['GroupLabel'] = df.apply(lambda r: infer_group_from_section(r['SectionID'], r['YearToken']), axis=1)
+        st.warning(f"Could not load reference data: {e}")
+        st.stop()
 
 timeslot_map = timeslots_df.set_index('TimeSlotID').to_dict('index')
 def get_time_label(ts_id):
@@ -373,24 +449,23 @@ def get_time_label(ts_id):
         return f"{ts['StartTime']} - {ts['EndTime']}"
     return ""
 
-df['TimeLabel'] = df['TimeSlot'].apply(get_time_label)
-
 courses_dict = courses_df.set_index('CourseID')['CourseName'].to_dict()
 def get_course_name(course_id):
     return courses_dict.get(course_id, course_id)
 
-df['CourseName'] = df['CourseID'].apply(get_course_name)
-
+# grid rows come from the timeslot table, so they don't depend on the slice
 days_ordered = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
-unique_days = [d for d in days_ordered if d in df['Day'].unique()]
-timeslot_order = sorted(df['TimeLabel'].unique(), key=parse_time_label)
+unique_days = [d for d in days_ordered if d in set(timeslots_df['Day'])]
+timeslot_order = sorted({get_time_label(ts) for ts in timeslots_df['TimeSlotID']}, key=parse_time_label)
+
+stats = run_stats(selected_run)
 
 col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
     st.markdown(f"""
     <div class="stat-card">
-        <div class="stat-number">{len(df)}</div>
+        <div class="stat-number">{stats['sessions']}</div>
         <div class="stat-label">Sessions</div>
     </div>
     """, unsafe_allow_html=True)
@@ -398,7 +473,7 @@ with col1:
 with col2:
     st.markdown(f"""
     <div class="stat-card">
-        <div class="stat-number">{df['SectionID'].nunique()}</div>
+        <div class="stat-number">{stats['sections']}</div>
         <div class="stat-label">Sections</div>
     </div>
     """, unsafe_allow_html=True)
@@ -406,7 +481,7 @@ with col2:
 with col3:
     st.markdown(f"""
     <div class="stat-card">
-        <div class="stat-number">{df['CourseID'].nunique()}</div>
+        <div class="stat-number">{stats['courses']}</div>
         <div class="stat-label">Courses</div>
     </div>
     """, unsafe_allow_html=True)
@@ -414,7 +489,7 @@ with col3:
 with col4:
     st.markdown(f"""
     <div class="stat-card">
-        <div class="stat-number">{df['Instructor'].nunique()}</div>
+        <div class="stat-number">{stats['instructors']}</div>
         <div class="stat-label">Instructors</div>
     </div>
     """, unsafe_allow_html=True)
@@ -422,7 +497,7 @@ with col4:
 with col5:
     st.markdown(f"""
     <div class="stat-card">
-        <div class="stat-number">{df['Room'].nunique()}</div>
+        <div class="stat-number">{stats['rooms']}</div>
         <div class="stat-label">Rooms</div>
     </div>
     """, unsafe_allow_html=True)
@@ -446,7 +521,21 @@ with col_filter2:
     else:
         selected_track = "All Tracks"
 
-filtered_df = df.copy()
+# only fetch the slice we are going to draw
+section_parts = []
+if selected_year != "All Years":
+    section_parts.append(f"_{year_token}")
+if selected_track != "All Tracks":
+    section_parts.append(selected_track)
+
+filtered_df = query_run(selected_run, section_contains=section_parts)
+
+filtered_df['YearToken'] = filtered_df['SectionID'].apply(extract_year)
+filtered_df['YearLabel'] = filtered_df['YearToken'].map(YEAR_LABELS)
+filtered_df['Track'] = filtered_df['SectionID'].apply(extract_track)
+filtered_df['GroupLabel'] = [infer_group_from_section(sid, yt) for sid, yt in zip(filtered_df['SectionID'], filtered_df['YearToken'])]
+filtered_df['TimeLabel'] = filtered_df['TimeSlot'].apply(get_time_label)
+filtered_df['CourseName'] = filtered_df['CourseID'].apply(get_course_name)
 
 if selected_year != "All Years":
     filtered_df = filtered_df[filtered_df['YearLabel'] == selected_year]
@@ -456,9 +545,66 @@ if selected_track != "All Tracks":
 
 st.markdown("---")
 
-def build_year_schedule(df_year):
+# what changed since the run we compare with, limited to the sections shown
+highlight = set()
+if compare_run is not None:
+    changes = diff_runs(compare_run, selected_run)
+    changes = changes[changes['SectionID'].isin(set(filtered_df['SectionID']))]
+    summary = summarize_changes(changes)
+    cols = st.columns(len(CHANGE_TYPES))
+    for col, change in zip(cols, CHANGE_TYPES):
+        col.metric(change.capitalize(), summary[change])
+    if changes.empty:
+        st.success(f"No differences with run {compare_run} in this view")
+    else:
+        with st.expander(f"{len(changes)} changes since run {compare_run}"):
+            st.dataframe(changes, hide_index=True)
+
+def render_card(course_data, changed=False):
+    extra = " changed-cell" if changed else ""
+    if not course_data:
+        return f'<td class="empty-cell section-col-cell{extra}"></td>'
+    
+    session_type = course_data.get('SessionType', '')
+    color = COLOR_MAP.get(session_type, "#FFD580")
+    course_name = course_data.get('CourseName', course_data['CourseID'])
+    instructor_name = course_data['Instructor']
+    
+    display_name = course_name if len(course_name) <= 30 else course_name[:27] + "..."
+    
+    card_html = (
+        f"<div class='course-card' style='background-color:{color}'>"
+        f"<span class='course-code'>{escape(course_data['CourseID'])}</span>"
+        f"<span class='course-info' style='font-size: 8px;'>{escape(display_name)}</span>"
+        f"<span class='course-info'>{escape(session_type)}</span>"
+        f"<span class='course-info'>{escape(instructor_name)}</span>"
+        f"<span class='course-info'>{escape(course_data['Room'])}</span>"
+        f"</div>"
+    )
+    return f'<td class="section-col-cell{extra}">{card_html}</td>'
+
+def group_cells(df):
+    return df.groupby(["Day", "TimeLabel", "SectionID"])[
+        ["CourseID", "CourseName", "SessionType", "Instructor", "Room"]
+    ].first().to_dict(orient='index')
+
+def grid_cell(grid, key):
+    # what a cell shows: its own entry, else a lecture of a sibling section
+    if key in grid['schedule']:
+        return grid['schedule'][key]
+    day, tl, section_id = key
+    group_label = grid['section_to_group'].get(section_id)
+    for sibling in sorted(grid['groups'].get(group_label, [])):
+        course_data = grid['schedule'].get((day, tl, sibling))
+        if course_data and course_data.get("SessionType", "") == "Lecture":
+            return course_data
+    return None
+
+def build_year_grid(df_year):
+    # the table as a list of html pieces plus where every cell sits in it,
+    # so a later run can patch single cells instead of redrawing everything
     if df_year.empty:
-        return "<p>No classes scheduled.</p>"
+        return None
     
     df_sections = df_year[['SectionID', 'GroupLabel']].drop_duplicates()
     
@@ -477,30 +623,20 @@ def build_year_schedule(df_year):
     df_sections = df_sections.drop('sort_key', axis=1)
     
     all_sections = df_sections['SectionID'].tolist()
-    groups_map = df_sections.groupby('GroupLabel', sort=False)['SectionID'].apply(list).to_dict()
-    section_to_group = df_sections.set_index('SectionID')['GroupLabel'].to_dict()
-    
-    schedule_grouped = df_year.groupby(["Day", "TimeLabel", "SectionID"])[
-        ["CourseID", "CourseName", "SessionType", "Instructor", "Room"]
-    ].first().to_dict(orient='index')
-    
-    final_schedule = schedule_grouped.copy()
-    
-    for (day, tl, section_id), course_data in schedule_grouped.items():
-        if course_data.get("SessionType", "") == "Lecture" and section_id in section_to_group:
-            group_label = section_to_group[section_id]
-            sibling_sections = groups_map.get(group_label, [])
-            
-            for sibling in sibling_sections:
-                sibling_key = (day, tl, sibling)
-                if sibling_key not in final_schedule:
-                    final_schedule[sibling_key] = course_data
+    grid = {
+        'sections': all_sections,
+        'groups': df_sections.groupby('GroupLabel', sort=False)['SectionID'].apply(list).to_dict(),
+        'section_to_group': df_sections.set_index('SectionID')['GroupLabel'].to_dict(),
+        'schedule': group_cells(df_year),
+        'cells': {},
+        'highlight': set(),
+    }
     
     html = ['<div class="timetable-container">', '<table class="time-table">']
     
     html.append('<thead><tr class="group-header">')
     html.append('<th colspan="2" rowspan="2"></th>')
-    for group, sections in groups_map.items():
+    for group, sections in grid['groups'].items():
         html.append(f'<th colspan="{len(sections)}">{escape(group)}</th>')
     html.append('</tr>')
     
@@ -532,33 +668,80 @@ def build_year_schedule(df_year):
             html.append(f'<td class="time-label-col">{escape(time_start_clean)}<br>{escape(time_end_clean)}<br><span style="font-size:8px">{period}</span></td>')
             
             for section_id in all_sections:
-                course_data = final_schedule.get((day, tl, section_id))
-                
-                if course_data:
-                    session_type = course_data.get('SessionType', '')
-                    color = COLOR_MAP.get(session_type, "#FFD580")
-                    course_name = course_data.get('CourseName', course_data['CourseID'])
-                    instructor_name = course_data['Instructor']
-                    
-                    display_name = course_name if len(course_name) <= 30 else course_name[:27] + "..."
-                    
-                    card_html = (
-                        f"<div class='course-card' style='background-color:{color}'>"
-                        f"<span class='course-code'>{escape(course_data['CourseID'])}</span>"
-                        f"<span class='course-info' style='font-size: 8px;'>{escape(display_name)}</span>"
-                        f"<span class='course-info'>{escape(session_type)}</span>"
-                        f"<span class='course-info'>{escape(instructor_name)}</span>"
-                        f"<span class='course-info'>{escape(course_data['Room'])}</span>"
-                        f"</div>"
-                    )
-                    html.append(f'<td class="section-col-cell">{card_html}</td>')
-                else:
-                    html.append('<td class="empty-cell section-col-cell"></td>')
+                key = (day, tl, section_id)
+                grid['cells'][key] = len(html)
+                html.append(render_card(grid_cell(grid, key)))
             
             html.append('</tr>')
     
     html.append('</tbody></table></div>')
-    return "\n".join(html)
+    grid['html'] = html
+    return grid
+
+def change_keys(changes):
+    # grid cells (Day, TimeLabel, SectionID) touched by a change set
+    keys = set()
+    for section_id, ts in changed_cells(changes):
+        ts_info = timeslot_map.get(ts)
+        if ts_info:
+            keys.add((ts_info['Day'], get_time_label(ts), section_id))
+    return keys
+
+def patch_year_grid(grid, df_year, changes=None, highlight=None):
+    # apply a change set from diff_timetables to a cached grid: only cells
+    # where an entry left or arrived (and their lecture siblings) are redrawn
+    # returns False when the columns changed and the grid must be rebuilt
+    if grid is None or df_year.empty:
+        return False
+    if set(df_year['SectionID']) != set(grid['sections']):
+        return False
+    
+    redraw = set()
+    if changes is not None:
+        keys = {k for k in change_keys(changes) if k in grid['cells']}
+        
+        # refresh the entries behind those cells from the new slice
+        affected_sections = {key[2] for key in keys}
+        for key in [k for k in grid['schedule'] if k[2] in affected_sections]:
+            del grid['schedule'][key]
+        grid['schedule'].update(group_cells(df_year[df_year['SectionID'].isin(affected_sections)]))
+        
+        # a lecture shows up in its siblings' empty cells too
+        for day, tl, section_id in keys:
+            for sibling in grid['groups'][grid['section_to_group'][section_id]]:
+                redraw.add((day, tl, sibling))
+    
+    if highlight is not None:
+        highlight = {k for k in highlight if k in grid['cells']}
+        redraw |= grid['highlight'] ^ highlight
+        grid['highlight'] = highlight
+    
+    for key in redraw:
+        grid['html'][grid['cells'][key]] = render_card(grid_cell(grid, key), key in grid['highlight'])
+    return True
+
+if compare_run is not None:
+    highlight = change_keys(changes)
+
+def year_schedule_html(view, df_year, highlight=frozenset()):
+    # draw one grid, reusing the cached one for this view when possible:
+    # same run -> as is, another run -> patched with the diff between them
+    cache = st.session_state.setdefault('grid_cache', {})
+    cached = cache.get(view)
+    
+    if cached and cached['run_id'] == selected_run:
+        grid = cached['grid']
+        patch_year_grid(grid, df_year, highlight=highlight)
+    elif cached and patch_year_grid(cached['grid'], df_year, diff_timetables(cached['df'], df_year), highlight):
+        grid = cached['grid']
+    else:
+        grid = build_year_grid(df_year)
+        patch_year_grid(grid, df_year, highlight=highlight)
+    
+    cache[view] = {'run_id': selected_run, 'df': df_year, 'grid': grid}
+    if grid is None:
+        return "<p>No classes scheduled.</p>"
+    return "\n".join(grid['html'])
 
 if selected_year == "All Years":
     for token, label in YEAR_LABELS.items():
@@ -568,13 +751,13 @@ if selected_year == "All Years":
         if df_year.empty:
             st.info(f"No classes for {label}")
         else:
-            html_schedule = build_year_schedule(df_year)
+            html_schedule = year_schedule_html((token, selected_track), df_year, highlight)
             st.markdown(html_schedule, unsafe_allow_html=True)
         
         st.markdown("<br>", unsafe_allow_html=True)
 else:
     st.markdown(f"### {selected_year}")
-    html_schedule = build_year_schedule(filtered_df)
+    html_schedule = year_schedule_html((selected_year, selected_track), filtered_df, highlight)
     st.markdown(html_schedule, unsafe_allow_html=True)
 
 st.markdown("---")
@@ -584,4 +767,22 @@ st.download_button(
     data=csv_data,
     file_name=f"timetable_{selected_year.replace(' ', '_')}.csv",
     mime="text/csv"
-)
\ No newline at end of file
+)
+
+# personal timetables for every instructor, room and section of this run
+with st.expander("📦 Export personal timetables"):
+    term_start = st.date_input("First day of term", key="export_term_start")
+    weeks = st.number_input("Weeks in term", min_value=1, max_value=52, value=15, step=1, key="export_weeks")
+    if st.button("Prepare export"):
+        with st.spinner("Rendering calendars..."):
+            st.session_state['export_zip'] = (selected_run, export_bytes(
+                query_run(selected_run), term_start=term_start, weeks=int(weeks), workers=1
+            ))
+    export = st.session_state.get('export_zip')
+    if export and export[0] == selected_run:
+        st.download_button(
+            label="Download iCalendar + CSV (zip)",
+            data=export[1],
+            file_name=f"timetables_run_{selected_run}.zip",
+            mime="application/zip"
+        )
\ No newline at end of file
@@ -1,6 +1,21 @@
-from Backend.solver import run_solver
+import argparse
+from Backend.solver import run_solver, SOLVER_MODES
+from Backend.data_loader import DataValidationError
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate the timetable")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="keep improving for this many seconds (anytime mode)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--mode", choices=SOLVER_MODES, default="greedy",
+                        help="greedy, or two_phase (timeslots first, then rooms by matching)")
+    parser.add_argument("--max-per-day", type=int, default=None, help="teaching cap per instructor per day")
+    parser.add_argument("--max-per-week", type=int, default=None, help="teaching cap per instructor per week")
+    parser.add_argument("--engine", choices=["pyarrow", "auto"], default=None,
+                        help="CSV reader (default: pandas, auto uses pyarrow when installed)")
+    parser.add_argument("--no-precheck", action="store_true", help="skip the capacity pre-check")
+    args = parser.parse_args()
+    
     print("=" * 80)
     print(" AUTOMATED TIMETABLE GENERATION SYSTEM")
     print(" Using Constraint Satisfaction Problem (CSP) Model")
@@ -9,7 +24,11 @@ def main():
     
     try:
         # run the solver
-        timetable_df = run_solver()
+        timetable_df = run_solver(
+            time_budget=args.budget, seed=args.seed, mode=args.mode,
+            max_per_day=args.max_per_day, max_per_week=args.max_per_week,
+            engine=args.engine, precheck=not args.no_precheck
+        )
         
         if not timetable_df.empty:
             print("\n" + "=" * 80)
@@ -36,6 +55,10 @@ def main():
     except FileNotFoundError as e:
         print(f"\n ERROR: {e}")
         print("💡 Make sure all CSV files are in the CSV/ folder")
+    except DataValidationError as e:
+        print(f"\n ERROR: the CSV files have {len(e.problems)} problems:")
+        for problem in e.problems:
+            print(f"   - {problem}")
     except Exception as e:
         print(f"\n UNEXPECTED ERROR: {e}")
         import traceback